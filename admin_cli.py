@@ -0,0 +1,283 @@
+"""
+Bulk admin commands: set-based, one transaction per run, against DATABASE_URL.
+
+    flask --app wsgi admin grant-courses --course 1,2,3,4 alice@example.com bob@example.com
+    flask --app wsgi admin grant-courses --course 2 --enroll beta_testers.txt
+    flask --app wsgi admin delete-users --yes gdpr_erasure.txt
+    cat emails.txt | flask --app wsgi admin anonymize-users --dry-run -
+
+Users are given as emails or numeric ids, either as arguments or one per line
+in files ('-' reads stdin; blank lines and # comments are skipped). Work is
+done with a handful of INSERT ... SELECT / UPDATE / DELETE statements per
+chunk of CHUNK_SIZE users rather than a query per user, all in one
+transaction: either every listed user is processed or none is. --dry-run
+reports the changes and rolls back.
+"""
+import os
+import sys
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import exists, insert, literal, select, true
+from models import db, User, Module, Purchase, Enrollment, UserCourseSummary, ChatHistory, ChatArchive
+
+# Users per statement; keeps IN lists well under SQLite's bind parameter limit
+CHUNK_SIZE = 5000
+
+# Free-text tables removed when an account is anonymized (the rest is kept for accounting)
+PERSONAL_CONTENT_TABLES = (ChatHistory.__table__, ChatArchive.__table__)
+
+admin_cli = AppGroup('admin', help='Bulk user and enrollment administration, data retention.')
+
+
+def chunks(values, size=CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def read_identifiers(sources):
+    """Expand arguments into emails and ids: '-' is stdin, an existing path is a file."""
+    identifiers = []
+    for source in sources:
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        elif os.path.isfile(source):
+            with open(source) as f:
+                lines = f.read().splitlines()
+        else:
+            lines = [source]
+        for line in lines:
+            value = line.split('#', 1)[0].strip()
+            if value:
+                identifiers.append(value)
+    return identifiers
+
+
+def resolve_users(sources):
+    """Return (sorted user ids, identifiers that matched no user)."""
+    identifiers = list(dict.fromkeys(read_identifiers(sources)))
+    if not identifiers:
+        raise click.UsageError('No users given (arguments, files or - for stdin).')
+    wanted_ids = [int(value) for value in identifiers if value.isdigit()]
+    wanted_emails = [value for value in identifiers if not value.isdigit()]
+
+    found_ids, found_emails = set(), set()
+    for chunk in chunks(wanted_ids):
+        found_ids.update(db.session.scalars(select(User.id).where(User.id.in_(chunk))))
+    for chunk in chunks(wanted_emails):
+        for user_id, email in db.session.execute(select(User.id, User.email).where(User.email.in_(chunk))):
+            found_ids.add(user_id)
+            found_emails.add(email)
+
+    missing = [value for value in wanted_ids if value not in found_ids]
+    missing += [value for value in wanted_emails if value not in found_emails]
+    if not found_ids:
+        raise click.ClickException(f'None of the {len(identifiers)} given user(s) exist.')
+    return sorted(found_ids), [str(value) for value in missing]
+
+
+def parse_course_ids(values):
+    course_ids = []
+    for value in values:
+        for part in value.split(','):
+            part = part.strip()
+            if not part.isdigit():
+                raise click.BadParameter(f'{part!r} is not a course id', param_hint='--course')
+            course_ids.append(int(part))
+    return sorted(set(course_ids))
+
+
+def user_tables():
+    """(table, column) for every table with a foreign key to users.id, dependents first.
+
+    Driven by the model metadata, so new per-user tables are covered without
+    touching this module and without relying on ON DELETE CASCADE (SQLite
+    doesn't enforce foreign keys here).
+    """
+    users = User.__table__
+    found = []
+    for table in reversed(db.metadata.sorted_tables):
+        for fk in table.foreign_keys:
+            if fk.column.table is users:
+                found.append((table, fk.parent))
+    return found
+
+
+def _no_row_in(table):
+    """Correlated NOT EXISTS: the outer (User.id, Module.id) pair has no row in table."""
+    other = table.alias()
+    return ~exists().where(other.c.user_id == User.id, other.c.module_id == Module.id)
+
+
+def report(counts, users, missing, dry_run):
+    for label, count in counts.items():
+        click.echo(f"  ✓ {label}: {count}")
+    if missing:
+        shown = ', '.join(missing[:10]) + (f' and {len(missing) - 10} more' if len(missing) > 10 else '')
+        click.echo(f"  ✗ {len(missing)} not found: {shown}")
+    if dry_run:
+        db.session.rollback()
+        click.echo(f"\nDry run for {users} user(s): rolled back, nothing changed")
+    else:
+        db.session.commit()
+        click.echo(f"\n✅ Done for {users} user(s)")
+
+
+def _count(counts, label, result):
+    counts[label] = counts.get(label, 0) + max(result.rowcount or 0, 0)
+
+
+@admin_cli.command('grant-courses')
+@click.option('--course', 'courses', multiple=True, required=True,
+              help='Course id to grant; repeat or comma-separate.')
+@click.option('--plan', default='one-time', show_default=True, help='plan_type for new purchases.')
+@click.option('--enroll', is_flag=True, help='Also create enrollments, as a test-mode purchase does.')
+@click.option('--dry-run', is_flag=True, help='Report the changes, then roll back.')
+@click.argument('users', nargs=-1, required=True)
+def grant_courses(courses, plan, enroll, dry_run, users):
+    """Give USERS completed purchases for the given courses."""
+    from routes.courses import courses_data
+
+    course_ids = parse_course_ids(courses)
+    Module.sync_catalog(courses_data)
+    known = set(db.session.scalars(select(Module.id).where(Module.id.in_(course_ids))))
+    unknown = [course_id for course_id in course_ids if course_id not in known]
+    if unknown:
+        raise click.BadParameter(f"unknown course id(s): {', '.join(map(str, unknown))}", param_hint='--course')
+
+    user_ids, missing = resolve_users(users)
+    click.echo(f"Granting course(s) {', '.join(map(str, course_ids))} to {len(user_ids)} user(s)")
+    now = datetime.utcnow()
+    purchases, enrollments, summaries = Purchase.__table__, Enrollment.__table__, UserCourseSummary.__table__
+    counts = {}
+
+    for chunk in chunks(user_ids):
+        # Every (user, course) pair in this chunk
+        users_modules = (select(User.id, Module.id)
+                         .join(Module, true())
+                         .where(User.id.in_(chunk), Module.id.in_(course_ids)))
+
+        # Existing pending/failed checkouts for these courses count as paid
+        _count(counts, 'purchases completed', db.session.execute(
+            purchases.update()
+            .where(purchases.c.user_id.in_(chunk), purchases.c.module_id.in_(course_ids),
+                   purchases.c.payment_status != 'completed')
+            .values(payment_status='completed')
+        ))
+        _count(counts, 'purchases created', db.session.execute(
+            insert(purchases).from_select(
+                ['user_id', 'module_id', 'plan_type', 'payment_status', 'stripe_payment_id', 'created_at'],
+                users_modules.add_columns(literal(plan), literal('completed'), literal('admin_grant'), literal(now))
+                .where(_no_row_in(purchases))
+            )
+        ))
+        if enroll:
+            _count(counts, 'enrollments created', db.session.execute(
+                insert(enrollments).from_select(
+                    ['user_id', 'module_id', 'progress', 'status', 'created_at'],
+                    users_modules.add_columns(literal(0), literal('in_progress'), literal(now))
+                    .where(_no_row_in(enrollments))
+                )
+            ))
+
+        # Keep the dashboard summary rows in step (see UserCourseSummary)
+        flags = {'purchased': True, 'updated_at': now}
+        if enroll:
+            flags.update(enrolled=True, enrolled_at=db.func.coalesce(summaries.c.enrolled_at, now))
+        db.session.execute(
+            summaries.update()
+            .where(summaries.c.user_id.in_(chunk), summaries.c.module_id.in_(course_ids))
+            .values(**flags)
+        )
+        _count(counts, 'summaries created', db.session.execute(
+            insert(summaries).from_select(
+                ['user_id', 'module_id', 'enrolled', 'purchased', 'progress', 'status', 'enrolled_at', 'updated_at'],
+                users_modules.add_columns(literal(enroll), true(), literal(0), literal('in_progress'),
+                                          literal(now), literal(now))
+                .where(_no_row_in(summaries))
+            )
+        ))
+
+    report(counts, len(user_ids), missing, dry_run)
+
+
+@admin_cli.command('delete-users')
+@click.option('--yes', is_flag=True, help="Don't ask for confirmation.")
+@click.option('--dry-run', is_flag=True, help='Report the changes, then roll back.')
+@click.argument('users', nargs=-1, required=True)
+def delete_users(yes, dry_run, users):
+    """Delete USERS and every row that references them."""
+    user_ids, missing = resolve_users(users)
+    if not (yes or dry_run):
+        click.confirm(f"Permanently delete {len(user_ids)} user(s) and all their data?", abort=True)
+
+    counts = {}
+    for table, column in user_tables():
+        for chunk in chunks(user_ids):
+            _count(counts, table.name, db.session.execute(table.delete().where(column.in_(chunk))))
+    for chunk in chunks(user_ids):
+        _count(counts, 'users', db.session.execute(User.__table__.delete().where(User.id.in_(chunk))))
+    report(counts, len(user_ids), missing, dry_run)
+
+
+@admin_cli.command('anonymize-users')
+@click.option('--yes', is_flag=True, help="Don't ask for confirmation.")
+@click.option('--dry-run', is_flag=True, help='Report the changes, then roll back.')
+@click.argument('users', nargs=-1, required=True)
+def anonymize_users(yes, dry_run, users):
+    """Strip personal data from USERS but keep their purchase and course records.
+
+    Name, email and password are replaced (the account can no longer log in)
+    and chat history is deleted.
+    """
+    user_ids, missing = resolve_users(users)
+    if not (yes or dry_run):
+        click.confirm(f"Anonymize {len(user_ids)} user(s)? This cannot be undone.", abort=True)
+
+    counts = {}
+    for chunk in chunks(user_ids):
+        for table in PERSONAL_CONTENT_TABLES:
+            _count(counts, f'{table.name} deleted', db.session.execute(table.delete().where(table.c.user_id.in_(chunk))))
+        _count(counts, 'users anonymized', db.session.execute(
+            User.__table__.update()
+            .where(User.id.in_(chunk))
+            .values(
+                name='Deleted user',
+                # Unique per row and never deliverable (.invalid is reserved)
+                email=literal('deleted-') + db.cast(User.id, db.String) + literal('@anonymized.invalid'),
+                # Not a valid hash, so check_password always fails
+                password_hash='!'
+            )
+        ))
+    report(counts, len(user_ids), missing, dry_run)
+
+
+@admin_cli.command('archive-chats')
+@click.option('--hot-days', type=int, help='Days kept in chat_history (default: CHAT_HOT_DAYS or 90).')
+@click.option('--codec', type=click.Choice(['auto', 'zstd', 'gzip']), help='Default: CHAT_ARCHIVE_CODEC or auto.')
+@click.option('--batch-users', default=100, show_default=True, help='Users archived per transaction.')
+@click.option('--throttle', default=0.05, show_default=True, help='Seconds to sleep between batches.')
+@click.option('--vacuum', is_flag=True, help='VACUUM afterwards (on SQLite this rewrites the whole file).')
+@click.option('--dry-run', is_flag=True, help='Compress and report, but roll every batch back.')
+def archive_chats(hot_days, codec, batch_users, throttle, vacuum, dry_run):
+    """Move chat turns older than the hot window into compressed per-user archives.
+
+    Unlike the other commands this commits per batch of users (each batch
+    moves its turns atomically), so a nightly run never holds long locks.
+    """
+    from chat_archive import run_retention, vacuum_chat_history
+    stats = run_retention(hot_days, codec, batch_users, throttle, dry_run, echo=click.echo)
+    if stats['turns']:
+        ratio = stats['raw_bytes'] / stats['stored_bytes']
+        click.echo(f"  ✓ {stats['turns']:,} turns into {stats['blobs']:,} blob(s): "
+                   f"{stats['raw_bytes'] / 1e6:.1f} MB -> {stats['stored_bytes'] / 1e6:.1f} MB ({ratio:.1f}x)")
+    if dry_run:
+        click.echo("\nDry run: rolled back, nothing changed")
+        return
+    if vacuum and stats['turns']:
+        vacuum_chat_history(db.engine, echo=click.echo)
+    click.echo("\n✅ Chat history archived")
+
+
+def register_admin_commands(app):
+    app.cli.add_command(admin_cli)
@@ -8,10 +8,8 @@ import os
 # Add parent directory to path to import app
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from app import create_app
-
-# Create Flask app instance
-app = create_app()
+# Shared module-level Flask app instance
+from wsgi import app
 
 # Vercel serverless function handler
 def handler(request, context):
@@ -1,12 +1,21 @@
 import os
-import stripe
-from flask import Flask, render_template
+import sys
+from datetime import timedelta
+from flask import Flask, render_template, jsonify
 from flask_login import LoginManager
-from flask_session import Session
-from flask_mail import Mail
 from dotenv import load_dotenv
 from models import db, User
-import redis
+from schema import register_commands, prepare_schema
+from admin_cli import register_admin_commands
+from db_pool import detect_profile, engine_options, pool_stats
+from db_routing import configure_replica
+from page_cache import init_page_cache, cached_page
+from assets import init_assets
+from media import init_media
+from request_metrics import init_request_metrics, require_metrics_token
+from query_profiler import init_query_profiler
+from llm_telemetry import init_llm_telemetry
+from sqlite_session import init_sessions
 
 # Load environment variables
 load_dotenv()
@@ -24,28 +33,43 @@ def create_app():
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-    }
+    
+    # Optional read replica (DATABASE_REPLICA_URL), see db_routing.py
+    app.config['REPLICA_BLUEPRINTS'] = os.getenv('DATABASE_REPLICA_BLUEPRINTS')
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', '10'))
+    configure_replica(app, os.getenv('DATABASE_REPLICA_URL'))
+    
+    # Pool sizing per deployment target (gunicorn / serverless / cli), see db_pool.py
+    app.config['DB_POOL_PROFILE'] = detect_profile()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url, app.config['DB_POOL_PROFILE'])
+    default_schema_check = 'check' if os.getenv('FLASK_ENV') == 'production' else 'create'
+    app.config['SCHEMA_CHECK'] = (os.getenv('SCHEMA_CHECK') or default_schema_check).lower()
     
     # Flask-Session configuration for chatbot conversation memory
     redis_url = os.getenv('REDIS_URL')
     if redis_url:
-        # Production: Use Redis for sessions
+        # Production: Use Redis for sessions (imported only when configured)
+        import redis
         app.config['SESSION_TYPE'] = 'redis'
         app.config['SESSION_REDIS'] = redis.from_url(redis_url)
     else:
-        # Development: Use filesystem
-        app.config['SESSION_TYPE'] = 'filesystem'
-        app.config['SESSION_FILE_DIR'] = os.path.join(os.path.dirname(__file__), 'flask_session')
+        # Development / single box: SQLite file with expiry and GC, see sqlite_session.py
+        app.config['SESSION_TYPE'] = 'sqlite'
+        app.config['SESSION_SQLITE_PATH'] = (os.getenv('SESSION_SQLITE_PATH')
+                                             or os.path.join(app.instance_path, 'sessions.db'))
+        app.config['SESSION_CLEANUP_N_REQUESTS'] = int(os.getenv('SESSION_CLEANUP_N_REQUESTS', '1000'))
     
     app.config['SESSION_PERMANENT'] = False
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=int(os.getenv('SESSION_LIFETIME_DAYS', '31')))
     app.config['SESSION_USE_SIGNER'] = True
     app.config['SESSION_COOKIE_SECURE'] = os.getenv('FLASK_ENV') == 'production'
     app.config['SESSION_COOKIE_HTTPONLY'] = True
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
     
+    # Bearer token protecting /metrics endpoints; without one they are only open outside production
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN') or None
+    app.config['METRICS_ALLOW_ANONYMOUS'] = os.getenv('FLASK_ENV') != 'production'
+    
     # Mail configuration
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER')
     app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', '587'))
@@ -54,14 +78,19 @@ def create_app():
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'no-reply@innerwork.demo')
     
-    # Stripe configuration
-    stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+    # Stripe configuration (the SDK itself is imported on first use, see stripe_payments.get_stripe)
+    app.config['STRIPE_SECRET_KEY'] = os.getenv('STRIPE_SECRET_KEY') or os.getenv('STRIPE_API_KEY')
     app.config['STRIPE_PUBLIC_KEY'] = os.getenv('STRIPE_PUBLIC_KEY')
     
-    # Initialize extensions
+    # Initialize extensions (Flask-Mail is set up lazily by stripe_payments.send_email_safe)
     db.init_app(app)
-    Session(app)
-    Mail(app)
+    init_sessions(app)
+    init_page_cache(app)
+    init_assets(app)
+    init_media(app)
+    init_request_metrics(app)
+    init_query_profiler(app)
+    init_llm_telemetry(app)
     
     # Flask-Login setup
     login_manager = LoginManager()
@@ -72,7 +101,8 @@ def create_app():
     def load_user(user_id):
         return User.query.get(int(user_id))
     
-    # Register blueprints
+    # Register blueprints. Route modules are cheap to import; their heavy SDKs
+    # (openai, stripe, reportlab, flask_mail) are imported on first use.
     from routes.auth import auth_bp
     from routes.modules import modules_bp
     from routes.chatbot import chatbot_bp
@@ -95,20 +125,57 @@ def create_app():
     
     # Home route
     @app.route('/')
+    @cached_page
     def index():
         return render_template('index.html')
     
     # Virtual Elliott Demo
     @app.route('/demo/elliott')
+    @cached_page
     def elliott_demo():
         return render_template('elliott_demo.html')
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Connection pool metrics for this worker (all workers: see /metrics)
+    @app.route('/metrics/db-pool')
+    def db_pool_metrics():
+        require_metrics_token()
+        return jsonify({
+            'profile': app.config['DB_POOL_PROFILE'],
+            'pool': pool_stats.snapshot(),
+            'status': db.engine.pool.status(),
+        })
+    
+    # Schema creation is explicit (`flask --app wsgi init-db`); startup only
+    # does what SCHEMA_CHECK asks for - see schema.py
+    register_commands(app)
+    register_admin_commands(app)
+    prepare_schema(app, app.config['SCHEMA_CHECK'])
     
     return app
 
+def reset_after_fork(app):
+    """Drop resources a forked worker inherited from a preloading master.
+    
+    Called from gunicorn's post_fork hook so that sockets opened while the
+    master built the app (DB pool, Redis, OpenAI HTTP pool) are never shared
+    between worker processes.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: leave the parent's connections alone, just forget them
+            engine.dispose(close=False)
+    
+    redis_client = app.config.get('SESSION_REDIS')
+    if redis_client is not None:
+        redis_client.connection_pool.reset()
+    
+    if hasattr(app.session_interface, 'reset'):
+        app.session_interface.reset()
+    
+    chatbot = sys.modules.get('routes.chatbot')
+    if chatbot is not None:
+        chatbot.reset_client()
+
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5001)
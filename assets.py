@@ -0,0 +1,158 @@
+"""
+Fingerprinted static assets.
+
+Build step (run by build.sh):
+
+    python assets.py
+
+copies every file under static/ into static/dist/ with a content hash in its
+name (css/style.css -> css/style.3f2a1b9c0d.css), writes gzip and, when the
+optional `brotli` package is installed, brotli variants of text assets next
+to them, and records the mapping in static/dist/manifest.json.
+
+At runtime, templates call asset_url('css/style.css') - same filename
+argument as url_for('static', ...). With a manifest it points at
+/assets/<hashed name>, served with `Cache-Control: public, max-age=31536000,
+immutable` and a precompressed body when the browser accepts one. Without a
+manifest (local development) it falls back to the plain static URL.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from flask import Blueprint, request, send_from_directory, url_for, abort
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Text formats worth precompressing; audio, video and images are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.html', '.txt', '.map'}
+# (Accept-Encoding token, file suffix) in order of preference
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+assets_bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+_manifest = None
+
+
+def _hashed_name(relpath, digest):
+    root, ext = os.path.splitext(relpath)
+    return f'{root}.{digest[:10]}{ext}'
+
+
+def _file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _precompress(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    with gzip.open(path + '.gz', 'wb', compresslevel=9) as f:
+        f.write(data)
+
+    try:
+        import brotli
+    except ImportError:
+        return False
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+    return True
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Fingerprint and precompress everything under static_dir into dist_dir."""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    brotli_available = True
+    for root, dirs, files in os.walk(static_dir):
+        # Never fingerprint our own output
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relpath = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            hashed = _hashed_name(relpath, _file_digest(source))
+            target = os.path.join(dist_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                brotli_available = _precompress(target) and brotli_available
+            manifest[relpath] = hashed
+            print(f"✓ {relpath} -> {hashed}")
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if not brotli_available:
+        print("  Note: brotli not installed, wrote gzip only. Run: pip install brotli")
+    print(f"\n✅ Fingerprinted {len(manifest)} asset(s) into {dist_dir}")
+    return manifest
+
+
+def load_manifest():
+    """Return the asset manifest ({} when assets haven't been built)."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def manifest_version():
+    """Short hash of the manifest, for cache keys of pages that embed asset URLs."""
+    manifest = load_manifest()
+    return hashlib.sha1(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()[:10] if manifest else 'none'
+
+
+def asset_url(filename, **values):
+    """url_for('static', filename=...) equivalent that prefers the fingerprinted copy."""
+    hashed = load_manifest().get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename, **values)
+    return url_for('assets.asset', filename=hashed, **values)
+
+
+@assets_bp.route('/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted file, precompressed when the client accepts it."""
+    if filename == 'manifest.json':
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = None
+    for encoding, suffix in PRECOMPRESSED:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app):
+    app.register_blueprint(assets_bp)
+    app.add_template_global(asset_url)
+
+
+if __name__ == '__main__':
+    build()
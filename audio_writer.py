@@ -0,0 +1,109 @@
+"""
+Streaming WAV writer for placeholder and synthesized voice lines
+
+    python audio_writer.py [--speaker debbie|elliott] [--force] [--jobs N]
+
+write_wav() streams PCM chunks straight to disk: the WAV header is written
+once up front and each chunk goes out as it is produced, so memory stays
+constant however long the clip is (a 20-minute micro-practice costs the same
+as a 3-second greeting). Pass it any iterable of bytes, e.g. silence() for
+placeholders or the chunks of a text-to-speech response.
+
+The batch generator reads static/media/voice_lines.json (file, speaker,
+duration, text per line) and writes every missing line concurrently;
+--force regenerates existing files too. Recorded or synthesized lines can
+simply replace the placeholder files - transcode_media.py picks them up.
+"""
+
+import argparse
+import json
+import os
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MEDIA_DIR = os.path.join(BASE_DIR, 'static', 'media')
+VOICE_LINES_PATH = os.path.join(MEDIA_DIR, 'voice_lines.json')
+
+SAMPLE_RATE = 44100
+SAMPLE_WIDTH = 2  # 16-bit audio
+NUM_CHANNELS = 1
+CHUNK_FRAMES = 32768
+
+
+def silence(duration_seconds, sample_rate=SAMPLE_RATE, num_channels=NUM_CHANNELS,
+            sample_width=SAMPLE_WIDTH, chunk_frames=CHUNK_FRAMES):
+    """Yield silent PCM in chunks of at most chunk_frames frames."""
+    frame_size = num_channels * sample_width
+    remaining = int(sample_rate * duration_seconds)
+    full_chunk = bytes(chunk_frames * frame_size)
+    while remaining > 0:
+        frames = min(chunk_frames, remaining)
+        yield full_chunk if frames == chunk_frames else bytes(frames * frame_size)
+        remaining -= frames
+
+
+def write_wav(filename, chunks, nframes=0, sample_rate=SAMPLE_RATE,
+              num_channels=NUM_CHANNELS, sample_width=SAMPLE_WIDTH):
+    """Stream PCM chunks to a WAV file; returns the number of frames written.
+
+    Pass nframes when the length is known so the header is right from the
+    start; otherwise it is patched once when the file is closed.
+    """
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with wave.open(filename, 'wb') as wav_file:
+        wav_file.setnchannels(num_channels)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(sample_rate)
+        wav_file.setnframes(nframes)
+        for chunk in chunks:
+            # writeframesraw skips the header rewrite writeframes does on every call
+            wav_file.writeframesraw(chunk)
+        return wav_file.getnframes()
+
+
+def create_silent_audio(filename, duration_seconds=3, sample_rate=SAMPLE_RATE):
+    """Create a silent WAV file (placeholder until a real recording replaces it)"""
+    write_wav(filename, silence(duration_seconds, sample_rate),
+              nframes=int(sample_rate * duration_seconds), sample_rate=sample_rate)
+    print(f"✓ Created: {filename}")
+
+
+def load_voice_lines(path=VOICE_LINES_PATH, speaker=None):
+    """Return (sample_rate, lines) from the voice lines manifest, optionally for one speaker."""
+    with open(path) as f:
+        manifest = json.load(f)
+    lines = manifest['lines']
+    if speaker:
+        lines = [line for line in lines if line.get('speaker') == speaker]
+    return manifest.get('sample_rate', SAMPLE_RATE), lines
+
+
+def generate_lines(lines, media_dir=MEDIA_DIR, sample_rate=SAMPLE_RATE, force=True, jobs=None):
+    """Write a placeholder WAV for each line concurrently; returns the paths written."""
+    todo = []
+    for line in lines:
+        path = os.path.join(media_dir, line['file'])
+        if force or not os.path.exists(path):
+            todo.append((path, line['duration']))
+        else:
+            print(f"  {line['file']}: exists, skipped")
+
+    # Writing is I/O bound and file writes release the GIL, so threads suffice
+    with ThreadPoolExecutor(max_workers=jobs or min(8, (os.cpu_count() or 1) + 4)) as pool:
+        list(pool.map(lambda item: create_silent_audio(item[0], item[1], sample_rate), todo))
+    return [path for path, _ in todo]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate placeholder voice lines from voice_lines.json.')
+    parser.add_argument('--manifest', default=VOICE_LINES_PATH, help='voice lines manifest (JSON)')
+    parser.add_argument('--speaker', help='only generate lines for this speaker (debbie, elliott)')
+    parser.add_argument('--force', action='store_true', help='overwrite lines that already exist')
+    parser.add_argument('--jobs', type=int, default=None, help='concurrent writers')
+    args = parser.parse_args()
+
+    rate, voice_lines = load_voice_lines(args.manifest, args.speaker)
+    written = generate_lines(voice_lines, os.path.dirname(os.path.abspath(args.manifest)), rate,
+                             force=args.force, jobs=args.jobs)
+    print(f"\n✅ Wrote {len(written)} of {len(voice_lines)} voice line(s)")
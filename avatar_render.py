@@ -0,0 +1,139 @@
+"""
+Vectorized placeholder avatar renderer
+Shared by generate_placeholders.py (Virtual Debbie) and generate_elliott_placeholders.py
+
+The shaded face disc only depends on the pixel's distance from the center, so
+the mask and brightness ramp are computed once with NumPy; each frame is then
+a single broadcast multiply by that frame's face color, plus a few ImageDraw
+shapes for eyes and smile. Frames are independent and are rendered in
+parallel worker processes.
+
+Requires numpy and Pillow (pip install numpy Pillow).
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# face_from/face_to: face color at the start/middle of the loop; blink_every: seconds
+# between blinks, eyes_open: fraction of that period the eyes are open;
+# indicator: color of the pulsing "recording" dot in the top right, or None
+AvatarTheme = namedtuple('AvatarTheme', [
+    'face_from', 'face_to', 'background', 'eye_color', 'smile_color',
+    'blink_every', 'eyes_open', 'indicator',
+])
+
+DEBBIE_THEME = AvatarTheme(
+    face_from=(197, 159, 201),  # lavender
+    face_to=(212, 165, 165),    # rose
+    background=(248, 245, 242),
+    eye_color=(60, 60, 60),
+    smile_color=(212, 165, 165),
+    blink_every=2,
+    eyes_open=0.9,
+    indicator=None,
+)
+
+ELLIOTT_THEME = AvatarTheme(
+    face_from=(100, 150, 200),
+    face_to=(140, 180, 220),
+    background=(232, 244, 248),
+    eye_color=(40, 60, 80),
+    smile_color=(80, 120, 160),
+    blink_every=3,
+    eyes_open=0.9,
+    indicator=(80, 120, 160),
+)
+
+# Per-process render state, built once by _init_worker
+_state = {}
+
+
+def face_mask(width, height):
+    """Boolean face disc and its radial brightness ramp (1.0 at the center, 0.7 at the edge)."""
+    radius = min(width, height) // 2.5
+    ys, xs = np.ogrid[:height, :width]
+    distance = np.hypot(xs - width // 2, ys - height // 2)
+    inside = distance < radius
+    brightness = 1 - (distance / radius) * 0.3
+    return inside, brightness
+
+
+def _init_worker(theme, width, height, fps, total_frames):
+    inside, brightness = face_mask(width, height)
+    _state.update(
+        theme=theme, width=width, height=height, fps=fps, total_frames=total_frames,
+        inside=inside,
+        # Only the face pixels need shading; keep them as a column for broadcasting
+        face_brightness=brightness[inside][:, np.newaxis],
+        background=np.broadcast_to(np.array(theme.background, dtype=np.uint8), (height, width, 3)),
+    )
+
+
+def _face_color(theme, progress):
+    # Runs face_from -> face_to -> face_from over the loop
+    t = abs(0.5 - progress) * 2
+    return np.array([int(a + (b - a) * t) for a, b in zip(theme.face_from, theme.face_to)], dtype=np.float64)
+
+
+def render_frame(i):
+    """Render frame i of the loop as raw RGB bytes (uses the per-process state)."""
+    theme, width, height, fps = _state['theme'], _state['width'], _state['height'], _state['fps']
+
+    pixels = _state['background'].copy()
+    shaded = _state['face_brightness'] * _face_color(theme, i / _state['total_frames'])
+    pixels[_state['inside']] = shaded.astype(np.uint8)
+
+    img = Image.fromarray(pixels, 'RGB')
+    draw = ImageDraw.Draw(img)
+
+    # Eyes (blinking)
+    if i % (fps * theme.blink_every) < fps * theme.blink_every * theme.eyes_open:
+        eye_y = height // 2 - 20
+        draw.ellipse([width // 2 - 40, eye_y - 5, width // 2 - 30, eye_y + 5], fill=theme.eye_color)
+        draw.ellipse([width // 2 + 30, eye_y - 5, width // 2 + 40, eye_y + 5], fill=theme.eye_color)
+
+    # Smile
+    smile_y = height // 2 + 15
+    draw.arc([width // 2 - 30, smile_y, width // 2 + 30, smile_y + 30], 0, 180, fill=theme.smile_color, width=3)
+
+    if theme.indicator is not None:
+        pulse = int(20 + 10 * abs(0.5 - (i % 20) / 20) * 2)
+        draw.ellipse([width - 30, 20, width - 20, 30], fill=theme.indicator + (pulse,))
+
+    return img.tobytes()
+
+
+def render_frames(theme, width=220, height=220, duration_seconds=5, fps=10, workers=None):
+    """Render every frame of the avatar loop as PIL images, in parallel when workers > 1."""
+    total_frames = fps * duration_seconds
+    init_args = (theme, width, height, fps, total_frames)
+    workers = min(workers or os.cpu_count() or 1, total_frames)
+
+    if workers <= 1:
+        _init_worker(*init_args)
+        raw_frames = [render_frame(i) for i in range(total_frames)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            raw_frames = list(pool.map(render_frame, range(total_frames), chunksize=max(1, total_frames // workers)))
+
+    return [Image.frombytes('RGB', (width, height), raw) for raw in raw_frames]
+
+
+def save_avatar_gif(filename, theme, width=220, height=220, duration_seconds=5, fps=10, workers=None):
+    """Render the avatar loop and save it as an animated GIF; returns the GIF path."""
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    frames = render_frames(theme, width, height, duration_seconds, fps, workers)
+
+    gif_filename = filename.replace('.mp4', '.gif').replace('.webm', '.gif')
+    frames[0].save(
+        gif_filename,
+        save_all=True,
+        append_images=frames[1:],
+        duration=1000 // fps,  # ms per frame
+        loop=0
+    )
+    return gif_filename
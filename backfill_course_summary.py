@@ -0,0 +1,14 @@
+"""
+Rebuild the user_course_summary table from Progress, Enrollment and Purchase.
+Deploys backfill it through migration 8 (init-db); run this any time the rows drift.
+"""
+from app import create_app
+from models import db, UserCourseSummary
+
+app = create_app()
+
+with app.app_context():
+    print("Rebuilding user course summaries...")
+    count = UserCourseSummary.rebuild()
+    db.session.commit()
+    print(f"\n✅ Rebuilt {count} summary row(s)")
@@ -0,0 +1,90 @@
+"""
+Import-time benchmark for serverless cold starts.
+
+Imports the app entry point in a fresh interpreter with `python -X importtime`
+and reports the import cost per top-level package, plus the heaviest
+individual modules. Exits non-zero when the total exceeds the budget.
+
+    python bench_imports.py                   # import wsgi, default 600 ms budget
+    python bench_imports.py --budget-ms 250 --top 15
+    python bench_imports.py --target api.index --runs 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)$')
+
+
+def measure(target):
+    """Import `target` once in a subprocess; return [(module, self_us)]."""
+    env = dict(os.environ)
+    # No DB access during the measurement, and a dummy key so clients can be built
+    env.setdefault('SCHEMA_CHECK', 'skip')
+    env.setdefault('OPENAI_API_KEY', 'bench')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"✗ Importing {target} failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, module = match.groups()
+            rows.append((module, int(self_us)))
+    return rows
+
+
+def summarize(rows):
+    """Self time of every module rolled up into its top-level package (microseconds)."""
+    per_package = defaultdict(int)
+    for module, self_us in rows:
+        per_package[module.split('.')[0]] += self_us
+    return per_package
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report per-module import cost of the app entry point.')
+    parser.add_argument('--target', default='wsgi', help='Module to import (default: wsgi)')
+    parser.add_argument('--budget-ms', type=float, default=600.0, help='Fail if total import time exceeds this')
+    parser.add_argument('--top', type=int, default=10, help='How many packages/modules to list')
+    parser.add_argument('--runs', type=int, default=5, help='Take the fastest of N runs to reduce noise')
+    args = parser.parse_args()
+
+    best_rows = None
+    best_total = None
+    for _ in range(args.runs):
+        rows = measure(args.target)
+        total = sum(self_us for _module, self_us in rows)
+        if best_total is None or total < best_total:
+            best_rows, best_total = rows, total
+
+    per_package = summarize(best_rows)
+
+    print(f"\nImport time for `{args.target}` (best of {args.runs}): {best_total / 1000:.1f} ms\n")
+    print("Top packages (self time rolled up):")
+    for package, us in sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {package}")
+
+    print("\nHeaviest modules (self time):")
+    for module, self_us in sorted(best_rows, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {module}")
+
+    if best_total / 1000 > args.budget_ms:
+        print(f"\n✗ Over budget: {best_total / 1000:.1f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"\n✅ Within budget ({args.budget_ms:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,523 @@
+"""
+Offline load test for the main user journeys.
+
+Builds the app in-process against a scratch database, seeds users with
+enrollments and chat history, stubs out OpenAI, Stripe and email, then drives
+scripted journeys through concurrent test clients and reports throughput and
+p50/p95/p99 latency per endpoint. Nothing leaves the machine.
+
+Journeys (weighted, see JOURNEYS):
+    browse   - home page, course list, a course page (anonymous)
+    learner  - login, dashboards, three lessons, progress update, logout
+    chat     - login, chatbot page, three messages, chat history
+    buyer    - register, login, buy a course, first lesson, quiz, certificate
+
+    python bench_journeys.py run                          # temp SQLite, defaults
+    python bench_journeys.py run --journeys 1000 --concurrency 8 --json out.json
+    python bench_journeys.py run --database-url postgresql://localhost/innerwork_bench --reset-db
+    python bench_journeys.py compare main HEAD            # exits 1 on a p95 regression
+    python bench_journeys.py compare HEAD .               # "." = the working tree
+
+`compare` checks each revision out into a temporary git worktree and runs this
+copy of the harness against it, so older revisions are measured the same way.
+The same --seed gives the same data and journey sequence on every run.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_PASSWORD = 'bench-password'
+STUB_REPLY = "That sounds like a lot to carry. What feels most important to you right now?"
+
+JOURNEYS = {
+    'browse': 3,
+    'learner': 4,
+    'chat': 2,
+    'buyer': 1,
+}
+
+QUIZ_QUESTIONS = json.dumps([
+    {"question": "Which statement fits this course best?", "options": ["A", "B", "C"], "correct_answer": "A"},
+    {"question": "What is a healthy next step?", "options": ["A", "B", "C"], "correct_answer": "B"},
+])
+
+
+# ---------------------------------------------------------------------------
+# Stubs
+# ---------------------------------------------------------------------------
+
+def install_stubs(llm_latency_ms):
+    """Replace the OpenAI and Stripe SDK calls with local fakes.
+
+    Patched at the SDK level so any revision's client code (streaming or not,
+    module-level or lazily built client) hits the stub.
+    """
+    delay = llm_latency_ms / 1000.0
+
+    def fake_create(self, *args, **kwargs):
+        usage = SimpleNamespace(prompt_tokens=420, completion_tokens=24,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=0))
+        if not kwargs.get('stream'):
+            time.sleep(delay)
+            message = SimpleNamespace(content=STUB_REPLY, role='assistant')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason='stop')], usage=usage)
+
+        def chunks():
+            time.sleep(delay / 2)
+            words = STUB_REPLY.split(' ')
+            for i, word in enumerate(words):
+                delta = SimpleNamespace(content=word if i == 0 else ' ' + word)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+            time.sleep(delay / 2)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason='stop')],
+                                  usage=None)
+            yield SimpleNamespace(choices=[], usage=usage)
+        return chunks()
+
+    from openai.resources.chat import Completions
+    Completions.create = fake_create
+
+    try:
+        from stripe.checkout import Session
+    except ImportError:
+        return
+    Session.create = staticmethod(
+        lambda **kwargs: SimpleNamespace(id='cs_bench', url='https://checkout.stripe.test/cs_bench'))
+
+
+def silence_app(app):
+    """Keep console-fallback emails, warnings and tracebacks out of the report (errors are counted)."""
+    import logging
+    app.logger.setLevel(logging.CRITICAL)
+    payments = sys.modules.get('routes.stripe_payments')
+    if payments is not None and hasattr(payments, 'send_email_safe'):
+        payments.send_email_safe = lambda *args, **kwargs: True
+
+
+# ---------------------------------------------------------------------------
+# App and data
+# ---------------------------------------------------------------------------
+
+def build_app(database_url, session_path):
+    """Create the app from the current working directory against database_url."""
+    os.environ.update({
+        'DATABASE_URL': database_url,
+        'SESSION_SQLITE_PATH': session_path,
+        'SCHEMA_CHECK': 'skip',
+        'FLASK_ENV': 'development',
+        'OPENAI_API_KEY': 'bench',
+        'STRIPE_SECRET_KEY': 'sk_test_bench',
+        # Empty values win over .env (load_dotenv does not override), keeping the run offline
+        'REDIS_URL': '',
+        'MAIL_SERVER': '',
+        'DATABASE_REPLICA_URL': '',
+        'METRICS_STORE': 'local',
+        'QUERY_BUDGET_MODE': 'off',
+    })
+    from app import create_app
+    return create_app()
+
+
+def seed(app, users, rng):
+    """Recreate the tables and bulk-insert modules, users, enrollments and chat history.
+
+    Returns ([(email, enrolled course ids)], course ids, {course id: lesson ids}).
+    """
+    from datetime import datetime, timedelta
+    from werkzeug.security import generate_password_hash
+    import models
+    from models import db
+    from routes.courses import courses_data
+    from routes.lessons import lesson_data
+
+    course_ids = [course['id'] for course in courses_data]
+    lessons = {course_id: [lesson['id'] for lesson in lesson_data.get(course_id, [])] for course_id in course_ids}
+    # One hash for every seeded user: logins still pay the full verify cost
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        db.session.execute(models.Module.__table__.insert(), [
+            {'id': course['id'], 'title': course['title'], 'description': course['description'],
+             'quiz_questions': QUIZ_QUESTIONS, 'price_cents': course['price_cents'],
+             'created_at': now, 'updated_at': now}
+            for course in courses_data
+        ])
+
+        emails = [f'bench-{i}@example.test' for i in range(users)]
+        db.session.execute(models.User.__table__.insert(), [
+            {'id': i + 1, 'name': f'Bench User {i}', 'email': email, 'password_hash': password_hash,
+             'created_at': now - timedelta(days=rng.randint(0, 365))}
+            for i, email in enumerate(emails)
+        ])
+
+        accounts, enrollments, chats = [], [], []
+        for user_id, email in enumerate(emails, start=1):
+            enrolled = rng.sample(course_ids, rng.randint(1, min(3, len(course_ids))))
+            accounts.append((email, enrolled))
+            for course_id in enrolled:
+                progress = rng.choice((0, 10, 25, 40, 60, 80, 100))
+                enrollments.append({'user_id': user_id, 'module_id': course_id, 'progress': progress,
+                                    'status': 'complete' if progress == 100 else 'in_progress',
+                                    'created_at': now - timedelta(days=rng.randint(0, 90))})
+            for turn in range(rng.randint(0, 20)):
+                chats.append({'user_id': user_id, 'message': f'Seeded message {turn}', 'response': STUB_REPLY,
+                              'timestamp': now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))})
+        db.session.execute(models.Enrollment.__table__.insert(), enrollments)
+        if chats:
+            db.session.execute(models.ChatHistory.__table__.insert(), chats)
+
+        # Revisions with the dashboard summary table need it filled in too
+        summary = getattr(models, 'UserCourseSummary', None)
+        if summary is not None and hasattr(summary, 'rebuild'):
+            summary.rebuild()
+        db.session.commit()
+
+        # Postgres sequences don't move for explicit ids
+        if db.engine.dialect.name == 'postgresql':
+            for table in ('users', 'modules'):
+                db.session.execute(db.text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+            db.session.commit()
+
+    return accounts, course_ids, lessons
+
+
+# ---------------------------------------------------------------------------
+# Journeys
+# ---------------------------------------------------------------------------
+
+class VirtualUser:
+    """One test client plus the timings it records."""
+
+    def __init__(self, app, ctx, rng, samples, name):
+        self.client = app.test_client()
+        self.ctx = ctx
+        self.rng = rng
+        self.samples = samples
+        self.name = name
+
+    def step(self, label, method, url, **kwargs):
+        started = time.perf_counter()
+        response = self.client.open(url, method=method, **kwargs)
+        elapsed = time.perf_counter() - started
+        response.close()
+        self.samples[label].append((elapsed, response.status_code))
+        return response
+
+    def login(self, email):
+        self.step('POST /login', 'POST', '/login', data={'email': email, 'password': BENCH_PASSWORD})
+
+    def logout(self):
+        self.step('GET /logout', 'GET', '/logout')
+
+
+def journey_browse(vu):
+    course_id = vu.rng.choice(vu.ctx.course_ids)
+    vu.step('GET /', 'GET', '/')
+    vu.step('GET /courses/', 'GET', '/courses/')
+    vu.step('GET /courses/<id>', 'GET', f'/courses/{course_id}')
+
+
+def journey_learner(vu):
+    email, enrolled = vu.rng.choice(vu.ctx.accounts)
+    course_id = vu.rng.choice(enrolled)
+    vu.login(email)
+    vu.step('GET /dashboard', 'GET', '/dashboard')
+    vu.step('GET /dashboard/', 'GET', '/dashboard/')
+    for lesson_id in vu.ctx.lessons[course_id][:3]:
+        vu.step('GET /lessons/<course>/<lesson>', 'GET', f'/lessons/{course_id}/{lesson_id}')
+    vu.step('POST /dashboard/progress/<id>/<pct>', 'POST',
+            f'/dashboard/progress/{course_id}/{vu.rng.randint(1, 100)}')
+    vu.logout()
+
+
+def journey_chat(vu):
+    vu.login(vu.rng.choice(vu.ctx.accounts)[0])
+    vu.step('GET /chatbot', 'GET', '/chatbot')
+    for i in range(3):
+        vu.step('POST /chatbot/message', 'POST', '/chatbot/message', json={'message': f'Benchmark message {i}'})
+    vu.step('GET /chatbot/history', 'GET', '/chatbot/history')
+    vu.logout()
+
+
+def journey_buyer(vu):
+    email = f'bench-new-{vu.name}-{vu.rng.getrandbits(40):x}@example.test'
+    course_id = vu.rng.choice(vu.ctx.course_ids)
+    vu.step('GET /register', 'GET', '/register')
+    vu.step('POST /register', 'POST', '/register',
+            data={'name': 'Bench Buyer', 'email': email, 'password': BENCH_PASSWORD})
+    vu.login(email)
+    vu.step('GET /courses/<id>', 'GET', f'/courses/{course_id}')
+    vu.step('POST /stripe/purchase/<id>', 'POST', f'/stripe/purchase/{course_id}')
+    vu.step('GET /lessons/<course>/<lesson>', 'GET', f'/lessons/{course_id}/1')
+    vu.step('POST /module/<id>/submit-quiz', 'POST', f'/module/{course_id}/submit-quiz',
+            data={'question_0': 'A', 'question_1': vu.rng.choice('ABC')})
+    vu.step('GET /certificate/<id>', 'GET', f'/certificate/{course_id}')
+    vu.logout()
+
+
+JOURNEY_FUNCTIONS = {
+    'browse': journey_browse,
+    'learner': journey_learner,
+    'chat': journey_chat,
+    'buyer': journey_buyer,
+}
+
+
+def run_journeys(app, ctx, count, concurrency, seed_value, samples):
+    """Run `count` weighted-random journeys over `concurrency` threads; returns wall seconds."""
+    names = list(JOURNEYS)
+    weights = [JOURNEYS[name] for name in names]
+    per_thread = [count // concurrency + (1 if i < count % concurrency else 0) for i in range(concurrency)]
+    errors = []
+
+    def worker(index, journeys):
+        rng = random.Random(seed_value * 1000 + index)
+        try:
+            for n in range(journeys):
+                vu = VirtualUser(app, ctx, rng, samples, f'{index}-{n}')
+                JOURNEY_FUNCTIONS[rng.choices(names, weights)[0]](vu)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_thread)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return time.perf_counter() - started
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, wall_seconds):
+    endpoints = {}
+    for label, rows in samples.items():
+        times = sorted(elapsed * 1000 for elapsed, _status in rows)
+        endpoints[label] = {
+            'count': len(rows),
+            'errors': sum(1 for _elapsed, status in rows if status >= 400),
+            'statuses': dict(sorted(_count_statuses(rows).items())),
+            'rps': len(rows) / wall_seconds if wall_seconds else 0.0,
+            'mean_ms': sum(times) / len(times),
+            'p50_ms': percentile(times, 50),
+            'p95_ms': percentile(times, 95),
+            'p99_ms': percentile(times, 99),
+        }
+    total = sum(endpoint['count'] for endpoint in endpoints.values())
+    return {
+        'requests': total,
+        'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+        'seconds': wall_seconds,
+        'rps': total / wall_seconds if wall_seconds else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def _count_statuses(rows):
+    counts = defaultdict(int)
+    for _elapsed, status in rows:
+        counts[str(status)] += 1
+    return counts
+
+
+def print_report(result):
+    meta = result['meta']
+    print(f"\n{meta['journeys']} journeys x {meta['concurrency']} threads on {meta['database']} "
+          f"({meta['users']} seeded users, LLM stub {meta['llm_latency_ms']} ms)")
+    print(f"{result['requests']} requests in {result['seconds']:.2f}s = {result['rps']:.1f} req/s, "
+          f"{result['errors']} error(s)\n")
+    print(f"  {'endpoint':<38} {'n':>6} {'err':>4} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, stats in sorted(result['endpoints'].items()):
+        print(f"  {label:<38} {stats['count']:>6} {stats['errors']:>4} {stats['rps']:>7.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+
+# ---------------------------------------------------------------------------
+# Commands
+# ---------------------------------------------------------------------------
+
+def cmd_run(args):
+    app_dir = os.path.abspath(args.app_dir)
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+
+    database_url = args.database_url
+    if database_url is not None and not args.reset_db:
+        raise SystemExit("✗ --database-url drops and recreates every table; pass --reset-db to confirm")
+    # Scratch SQLite database (unless --database-url) and session store
+    scratch = tempfile.mkdtemp(prefix='innerwork-bench-')
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+
+    try:
+        app = build_app(database_url, os.path.join(scratch, 'sessions.db'))
+        install_stubs(args.llm_latency_ms)
+        silence_app(app)
+
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        accounts, course_ids, lessons = seed(app, args.users, rng)
+        print(f"✓ Seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+        ctx = SimpleNamespace(accounts=accounts, course_ids=course_ids, lessons=lessons)
+
+        if args.warmup:
+            # Fills template, page and quiz caches; timings are thrown away
+            run_journeys(app, ctx, args.warmup, 1, args.seed + 1, defaultdict(list))
+
+        samples = defaultdict(list)
+        wall = run_journeys(app, ctx, args.journeys, args.concurrency, args.seed, samples)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    result = summarize(samples, wall)
+    result['meta'] = {
+        'app_dir': app_dir,
+        'revision': _git_describe(app_dir),
+        'database': database_url.split(':', 1)[0] if args.database_url else 'sqlite (temp)',
+        'users': args.users,
+        'journeys': args.journeys,
+        'concurrency': args.concurrency,
+        'seed': args.seed,
+        'llm_latency_ms': args.llm_latency_ms,
+    }
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\n✓ Wrote {args.json}")
+    return result
+
+
+def _git_describe(path):
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=path, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def _run_revision(rev, workdir, run_args):
+    """Benchmark one revision in a subprocess; returns the parsed JSON result."""
+    out = os.path.join(workdir, f"result-{len(os.listdir(workdir))}.json")
+    if rev == '.':
+        app_dir, worktree = BASE_DIR, None
+    else:
+        worktree = app_dir = os.path.join(workdir, f"tree-{len(os.listdir(workdir))}")
+        subprocess.run(['git', 'worktree', 'add', '--detach', '--quiet', worktree, rev], cwd=BASE_DIR, check=True)
+    try:
+        print(f"\n=== {rev} ===")
+        subprocess.run([sys.executable, os.path.abspath(__file__), 'run', '--app-dir', app_dir,
+                        '--json', out] + run_args, check=True)
+    finally:
+        if worktree:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=BASE_DIR)
+    with open(out) as f:
+        return json.load(f)
+
+
+def cmd_compare(args):
+    run_args = ['--users', str(args.users), '--journeys', str(args.journeys),
+                '--concurrency', str(args.concurrency), '--seed', str(args.seed),
+                '--warmup', str(args.warmup), '--llm-latency-ms', str(args.llm_latency_ms)]
+    if args.database_url:
+        run_args += ['--database-url', args.database_url, '--reset-db']
+
+    workdir = tempfile.mkdtemp(prefix='innerwork-bench-compare-')
+    try:
+        base = _run_revision(args.base, workdir, run_args)
+        head = _run_revision(args.head, workdir, run_args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{args.base} -> {args.head}: {base['rps']:.1f} -> {head['rps']:.1f} req/s "
+          f"({_change(base['rps'], head['rps']):+.1f}%)\n")
+    print(f"  {'endpoint':<38} {'p50 ms':^19} {'p95 ms':^19} {'change':>8}")
+    regressions = []
+    for label in sorted(set(base['endpoints']) | set(head['endpoints'])):
+        before, after = base['endpoints'].get(label), head['endpoints'].get(label)
+        if before is None or after is None:
+            print(f"  {label:<38} {'only in ' + (args.head if before is None else args.base):>44}")
+            continue
+        change = _change(before['p95_ms'], after['p95_ms'])
+        # p95 of a handful of samples, or a millisecond of wobble on a fast endpoint, is noise
+        regressed = (change > args.threshold
+                     and after['p95_ms'] - before['p95_ms'] > args.min_delta_ms
+                     and min(before['count'], after['count']) >= args.min_samples)
+        if regressed:
+            regressions.append(label)
+        print(f"  {label:<38} {before['p50_ms']:>7.1f} -> {after['p50_ms']:<7.1f} "
+              f"{before['p95_ms']:>7.1f} -> {after['p95_ms']:<7.1f} {change:>+7.1f}%{'  ✗' if regressed else ''}")
+
+    if regressions:
+        print(f"\n✗ p95 regressed more than {args.threshold:.0f}% on {len(regressions)} endpoint(s)")
+        sys.exit(1)
+    print(f"\n✅ No p95 regression above {args.threshold:.0f}%")
+
+
+def _change(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def add_run_options(parser):
+    parser.add_argument('--database-url', help='Scratch database (default: a temporary SQLite file)')
+    parser.add_argument('--users', type=int, default=200, help='Seeded users (default: 200)')
+    parser.add_argument('--journeys', type=int, default=300, help='Measured journeys (default: 300)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent virtual users (default: 4)')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured warm-up journeys (default: 20)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and journeys')
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0, help='Simulated OpenAI latency per call')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the main user journeys offline.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Benchmark the app in --app-dir (default: this checkout)')
+    add_run_options(run)
+    run.add_argument('--app-dir', default=BASE_DIR, help='Checkout to benchmark')
+    run.add_argument('--reset-db', action='store_true', help='Allow dropping tables in --database-url')
+    run.add_argument('--json', help='Write results to this file')
+
+    compare = commands.add_parser('compare', help='Benchmark two git revisions and compare p95 latency')
+    compare.add_argument('base', help='Baseline revision (e.g. main)')
+    compare.add_argument('head', help='Revision to check, or "." for the working tree')
+    add_run_options(compare)
+    compare.add_argument('--threshold', type=float, default=15.0, help='Allowed p95 increase in percent')
+    compare.add_argument('--min-delta-ms', type=float, default=2.0, help='Ignore p95 increases below this')
+    compare.add_argument('--min-samples', type=int, default=20, help='Only judge endpoints with this many requests')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        cmd_run(args)
+    else:
+        cmd_compare(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,5 +6,11 @@ set -o errexit
 pip install --upgrade pip
 pip install -r requirements.txt
 
-# Run database migrations (create tables)
-python -c "from app import create_app; from models import db; app = create_app(); app.app_context().push(); db.create_all(); print('Database tables created successfully')"
+# Transcode avatar media into lighter formats (static/media/encoded)
+python transcode_media.py
+
+# Fingerprint and precompress static assets into static/dist
+python assets.py
+
+# Create missing tables and apply pending online migrations (kept out of app startup)
+SCHEMA_CHECK=skip flask --app wsgi init-db
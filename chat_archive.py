@@ -0,0 +1,258 @@
+"""
+Chat history retention: old turns move into compressed per-user archives.
+
+chat_history keeps a hot window of the last CHAT_HOT_DAYS days (default 90).
+The retention job (`flask --app wsgi admin archive-chats`, run nightly from
+cron) moves older turns into chat_archive: one compressed JSONL blob per user
+and calendar month (split every ARCHIVE_MAX_TURNS turns). Only whole months
+before the hot window are archived, so each month is written once instead of
+a sliver per run. Blobs are added and the source rows deleted in the same
+transaction, a batch of users at a time, so nothing is lost or duplicated if
+the job stops halfway.
+
+Blobs use zstd when the optional `zstandard` package is installed, gzip
+otherwise (CHAT_ARCHIVE_CODEC=auto|zstd|gzip). Reading a zstd blob needs
+zstandard too.
+
+history_page() serves /chatbot/history: newest turns first from the hot
+table, continuing into the archive once they run out, so clients just follow
+the next_before cursor ('<timestamp>_<id>', so turns sharing a timestamp are
+never skipped between pages).
+"""
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from models import db, ChatHistory, ChatArchive
+
+DEFAULT_HOT_DAYS = 90
+ARCHIVE_MAX_TURNS = 1000
+HISTORY_PAGE_SIZE = 50
+DELETE_CHUNK = 5000
+CODECS = ('zstd', 'gzip')
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd chat archives need the zstandard package (pip install zstandard)")
+    return zstandard
+
+
+def resolve_codec(name=None):
+    """Codec to write with: explicit name, CHAT_ARCHIVE_CODEC, or zstd if available else gzip."""
+    name = (name or os.getenv('CHAT_ARCHIVE_CODEC') or 'auto').lower()
+    if name == 'auto':
+        try:
+            import zstandard  # noqa: F401
+            return 'zstd'
+        except ImportError:
+            return 'gzip'
+    if name not in CODECS:
+        raise ValueError(f"CHAT_ARCHIVE_CODEC must be auto, zstd or gzip, got {name!r}")
+    return name
+
+
+def compress(raw, codec):
+    if codec == 'zstd':
+        return _zstandard().ZstdCompressor(level=10).compress(raw)
+    # mtime=0 keeps identical input byte-identical
+    return gzip.compress(raw, compresslevel=6, mtime=0)
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        return _zstandard().ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def encode_turns(rows):
+    """JSONL bytes for (id, message, response, timestamp) rows."""
+    return '\n'.join(
+        json.dumps({'id': row_id, 'message': message, 'response': response, 'timestamp': timestamp.isoformat()},
+                   ensure_ascii=False)
+        for row_id, message, response, timestamp in rows
+    ).encode('utf-8')
+
+
+def decode_turns(archive):
+    """The archive's turns, oldest first, as dicts with datetime timestamps."""
+    turns = []
+    for line in decompress(archive.data, archive.codec).decode('utf-8').splitlines():
+        turn = json.loads(line)
+        turn['timestamp'] = datetime.fromisoformat(turn['timestamp'])
+        turns.append(turn)
+    return turns
+
+
+# ---------------------------------------------------------------------------
+# Retention job
+# ---------------------------------------------------------------------------
+
+def hot_days():
+    return int(os.getenv('CHAT_HOT_DAYS', DEFAULT_HOT_DAYS))
+
+
+def archive_cutoff(days, now=None):
+    """Start of the month containing now - days: everything before it is archived."""
+    edge = (now or datetime.utcnow()) - timedelta(days=days)
+    return edge.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _blobs(rows):
+    """Split rows (oldest first) into per-month groups of at most ARCHIVE_MAX_TURNS."""
+    group, month = [], None
+    for row in rows:
+        row_month = (row.timestamp.year, row.timestamp.month)
+        if group and (row_month != month or len(group) >= ARCHIVE_MAX_TURNS):
+            yield group
+            group = []
+        group.append(row)
+        month = row_month
+    if group:
+        yield group
+
+
+def archive_user(user_id, cutoff, codec):
+    """Move one user's turns older than cutoff into archive blobs. Does not commit.
+
+    Returns a Counter of turns, blobs, raw_bytes and stored_bytes.
+    """
+    rows = (db.session.query(ChatHistory.id, ChatHistory.message, ChatHistory.response, ChatHistory.timestamp)
+            .filter(ChatHistory.user_id == user_id, ChatHistory.timestamp < cutoff)
+            .order_by(ChatHistory.timestamp, ChatHistory.id)
+            .all())
+    stats = Counter()
+    for group in _blobs(rows):
+        raw = encode_turns(group)
+        data = compress(raw, codec)
+        db.session.add(ChatArchive(
+            user_id=user_id,
+            period_start=group[0].timestamp,
+            period_end=group[-1].timestamp,
+            turn_count=len(group),
+            codec=codec,
+            raw_bytes=len(raw),
+            data=data
+        ))
+        stats.update(turns=len(group), blobs=1, raw_bytes=len(raw), stored_bytes=len(data))
+
+    ids = [row.id for row in rows]
+    table = ChatHistory.__table__
+    for start in range(0, len(ids), DELETE_CHUNK):
+        db.session.execute(table.delete().where(table.c.id.in_(ids[start:start + DELETE_CHUNK])))
+    return stats
+
+
+def run_retention(days=None, codec=None, user_batch=100, throttle=0.05, dry_run=False, echo=print):
+    """Archive every user's turns older than the hot window, committing per batch of users."""
+    days = hot_days() if days is None else days
+    codec = resolve_codec(codec)
+    cutoff = archive_cutoff(days)
+    user_ids = [row[0] for row in db.session.query(ChatHistory.user_id)
+                .filter(ChatHistory.timestamp < cutoff).distinct().order_by(ChatHistory.user_id)]
+    echo(f"Archiving turns before {cutoff:%Y-%m-%d} ({days}-day hot window, {codec}) for {len(user_ids)} user(s)")
+
+    stats = Counter()
+    started = time.perf_counter()
+    for start in range(0, len(user_ids), user_batch):
+        for user_id in user_ids[start:start + user_batch]:
+            stats += archive_user(user_id, cutoff, codec)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        done = min(start + user_batch, len(user_ids))
+        echo(f"    {done}/{len(user_ids)} users, {stats['turns']:,} turns ({time.perf_counter() - started:.1f}s)")
+        if throttle and done < len(user_ids):
+            time.sleep(throttle)
+    return stats
+
+
+def vacuum_chat_history(engine, echo=print):
+    """Give the deleted rows' space back (plain VACUUM on Postgres, a full rewrite on SQLite)."""
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if engine.dialect.name == 'postgresql':
+            conn.exec_driver_sql('VACUUM (ANALYZE) chat_history')
+        else:
+            conn.exec_driver_sql('VACUUM')
+    echo("  ✓ Vacuumed")
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _turn(turn_id, message, response, timestamp, archived):
+    return {'id': turn_id, 'message': message, 'response': response, 'timestamp': timestamp, 'archived': archived}
+
+
+def _key(turn):
+    return turn['timestamp'], turn['id']
+
+
+def encode_cursor(cursor):
+    """'<ISO timestamp>_<id>' for a (timestamp, id) history cursor."""
+    timestamp, turn_id = cursor
+    return f"{timestamp.isoformat()}_{turn_id}"
+
+
+def parse_cursor(value):
+    """(timestamp, id) from encode_cursor(); a bare ISO timestamp gives id None. Raises ValueError."""
+    timestamp, _, turn_id = value.partition('_')
+    return datetime.fromisoformat(timestamp), int(turn_id) if turn_id else None
+
+
+def history_page(user_id, before=None, limit=HISTORY_PAGE_SIZE):
+    """One page of a user's chat turns older than the `before` cursor.
+
+    The cursor is a (timestamp, id) pair, so turns sharing a timestamp are
+    never skipped between pages; an id of None means "strictly before the
+    timestamp". Returns (turns oldest first, cursor for the next older page
+    or None). Reads the hot table first and decompresses archive blobs only
+    when the page reaches past it, newest blob first.
+    """
+    query = ChatHistory.query.filter(ChatHistory.user_id == user_id)
+    if before is not None:
+        before_ts, before_id = before
+        if before_id is None:
+            query = query.filter(ChatHistory.timestamp < before_ts)
+        else:
+            query = query.filter(db.or_(
+                ChatHistory.timestamp < before_ts,
+                db.and_(ChatHistory.timestamp == before_ts, ChatHistory.id < before_id)
+            ))
+    rows = query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1).all()
+    turns = [_turn(row.id, row.message, row.response, row.timestamp, False) for row in rows]
+
+    if len(turns) <= limit:
+        boundary = _key(turns[-1]) if turns else before
+        archives = ChatArchive.query.filter(ChatArchive.user_id == user_id).options(db.defer(ChatArchive.data))
+        if boundary is not None:
+            archives = archives.filter(ChatArchive.period_start <= boundary[0])
+        for archive in archives.order_by(ChatArchive.period_end.desc(), ChatArchive.id.desc()).all():
+            # Blob payload is loaded here, one archive at a time
+            for turn in reversed(decode_turns(archive)):
+                if boundary is None or _before(turn, boundary):
+                    turns.append(_turn(turn['id'], turn['message'], turn['response'], turn['timestamp'], True))
+            if len(turns) > limit:
+                break
+
+    page = turns[:limit]
+    next_before = _key(page[-1]) if len(turns) > limit else None
+    page.reverse()
+    return page, next_before
+
+
+def _before(turn, boundary):
+    timestamp, turn_id = boundary
+    if turn_id is None:
+        return turn['timestamp'] < timestamp
+    return _key(turn) < (timestamp, turn_id)
@@ -0,0 +1,111 @@
+"""
+Full-text search over a user's chat turns (GET /chatbot/search).
+
+PostgreSQL matches websearch_to_tsquery('english', q) against the GIN-indexed
+CHAT_SEARCH_DOCUMENT expression (models.py) and ranks with ts_rank_cd.
+SQLite matches the chat_history_fts FTS5 table, scoped to the user's owner
+token (models.py), and ranks with a BM25-style score over the user's own
+matches: term hits counted with highlight(), saturated and normalised by
+length against the average matching turn. FTS5's bm25() is not used because
+its IDF reads every user's postings for each term on every query, so the
+cost would follow the whole table instead of the user's history. Both stem
+English words, so "boundary" also finds "boundaries". Every word and "quoted
+phrase" in the query has to match.
+
+Results come best match first (newest first on ties) in pages; has_more is
+found by fetching one row past the page rather than counting every match.
+Only chat_history is searched: turns moved to chat_archive by the retention
+job (chat_archive.py) are compressed and not indexed.
+"""
+import re
+from sqlalchemy import DateTime, Float, Integer, Text, text
+from models import db, CHAT_FTS_TABLE, CHAT_SEARCH_DOCUMENT
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 50
+MAX_QUERY_LENGTH = 200
+
+_RESULT_COLUMNS = dict(id=Integer, message=Text, response=Text, timestamp=DateTime, rank=Float)
+
+# The document expression is inlined, not bound: the planner only uses the
+# expression index for an identical expression
+_POSTGRES_SQL = f"""
+    SELECT id, message, response, timestamp, ts_rank_cd({CHAT_SEARCH_DOCUMENT}, query) AS rank
+    FROM chat_history, websearch_to_tsquery('english', :query) AS query
+    WHERE user_id = :user_id AND {CHAT_SEARCH_DOCUMENT} @@ query
+    ORDER BY rank DESC, timestamp DESC, id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+# BM25 term saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# :query is already scoped to the user (sqlite_match), c.user_id just
+# double-checks. highlight() marks each hit with one char(1), so the length
+# difference counts hits (in message and response only, not owner)
+_SQLITE_SQL = f"""
+    WITH hits AS (
+        SELECT c.id, c.message, c.response, c.timestamp,
+               length(highlight({CHAT_FTS_TABLE}, 0, char(1), '')) - length(c.message)
+               + length(highlight({CHAT_FTS_TABLE}, 1, char(1), '')) - length(c.response) AS tf,
+               length(c.message) + length(c.response) AS dl
+        FROM {CHAT_FTS_TABLE} JOIN chat_history c ON c.id = {CHAT_FTS_TABLE}.rowid
+        WHERE {CHAT_FTS_TABLE} MATCH :query AND c.user_id = :user_id
+    )
+    SELECT id, message, response, timestamp,
+           tf * {BM25_K1 + 1} / (tf + {BM25_K1} * ({1 - BM25_B} + {BM25_B} * dl / avg(dl) OVER ())) AS rank
+    FROM hits
+    ORDER BY rank DESC, timestamp DESC, id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+class SearchUnavailable(RuntimeError):
+    """The database has no full-text index for chat history."""
+
+
+def fts5_query(query):
+    """Turn free text into an FTS5 query: each word or "phrase" as a quoted phrase.
+
+    Quoting keeps FTS5 operators and punctuation in user input from being
+    parsed as query syntax. Returns '' when nothing searchable is left.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        tokens = re.findall(r'\w+', phrase or word)
+        if tokens:
+            terms.append('"' + ' '.join(tokens) + '"')
+    return ' '.join(terms)
+
+
+def sqlite_match(user_id, query):
+    """FTS5 MATCH for one user's turns: their owner token AND the terms in message/response."""
+    terms = fts5_query(query)
+    if not terms:
+        return ''
+    return f'owner:"u{int(user_id)}" AND {{message response}}: ({terms})'
+
+
+def search_turns(user_id, query, page=1, per_page=SEARCH_PAGE_SIZE):
+    """Return (turns best match first, has_more) for one page of a user's matches."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        sql, query = _POSTGRES_SQL, query.strip()
+    elif dialect == 'sqlite':
+        sql, query = _SQLITE_SQL, sqlite_match(user_id, query)
+    else:
+        raise SearchUnavailable(f"Chat search is not supported on {dialect}")
+    if not query:
+        return [], False
+
+    rows = db.session.execute(
+        text(sql).columns(**_RESULT_COLUMNS),
+        {'query': query, 'user_id': user_id, 'limit': per_page + 1, 'offset': (page - 1) * per_page}
+    ).all()
+    turns = [
+        {'id': row.id, 'message': row.message, 'response': row.response,
+         'timestamp': row.timestamp, 'rank': row.rank}
+        for row in rows[:per_page]
+    ]
+    return turns, len(rows) > per_page
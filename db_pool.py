@@ -0,0 +1,165 @@
+"""
+SQLAlchemy connection pool profiles and pool metrics.
+
+Each deployment target gets pool settings that fit its process model:
+
+    gunicorn    - many long-lived workers: small pool per worker, so
+                  workers * (pool_size + max_overflow) stays under the
+                  Postgres connection limit
+    serverless  - one request at a time per instance, short-lived: a single
+                  connection, recycled quickly
+    cli         - scripts and one-off commands: roomy pool, long timeout
+
+The profile comes from DB_POOL_PROFILE (gunicorn.conf.py sets it for web
+workers, VERCEL implies serverless, anything else defaults to cli). Individual
+values can be overridden with DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+and DB_POOL_RECYCLE. Set DB_EXTERNAL_POOLER=true when connecting through
+pgbouncer or a similar pooler: SQLAlchemy then uses NullPool and leaves
+pooling to it.
+"""
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool, NullPool
+
+POOL_PROFILES = {
+    'gunicorn': {'pool_size': 2, 'max_overflow': 3, 'pool_timeout': 10, 'pool_recycle': 300},
+    'serverless': {'pool_size': 1, 'max_overflow': 0, 'pool_timeout': 5, 'pool_recycle': 60},
+    'cli': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': 300},
+}
+
+_OVERRIDES = {
+    'pool_size': 'DB_POOL_SIZE',
+    'max_overflow': 'DB_MAX_OVERFLOW',
+    'pool_timeout': 'DB_POOL_TIMEOUT',
+    'pool_recycle': 'DB_POOL_RECYCLE',
+}
+
+
+class PoolStats:
+    """Process-wide pool counters, updated from pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def checked_out(self):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def checked_in(self):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def connected(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'in_use': self.in_use,
+                'max_in_use': self.max_in_use,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.waits, 6) if self.waits else 0.0,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckout:
+    """Pool mixin that measures how long a checkout waits for a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_stats.record_timeout()
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+@event.listens_for(Pool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.checked_out()
+
+
+@event.listens_for(Pool, 'checkin')
+def _on_checkin(dbapi_connection, connection_record):
+    pool_stats.checked_in()
+
+
+@event.listens_for(Pool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.connected()
+
+
+def detect_profile():
+    profile = os.getenv('DB_POOL_PROFILE')
+    if profile:
+        return profile.lower()
+    if os.getenv('VERCEL'):
+        return 'serverless'
+    return 'cli'
+
+
+def engine_options(database_url, profile=None):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the given URL and deployment profile."""
+    profile = profile or detect_profile()
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"DB_POOL_PROFILE must be one of {', '.join(POOL_PROFILES)}, got {profile!r}")
+
+    options = {'pool_pre_ping': True}
+
+    # SQLite picks its own pool class (and is never behind pgbouncer)
+    if database_url.startswith('sqlite'):
+        return options
+
+    if os.getenv('DB_EXTERNAL_POOLER', 'false').lower() == 'true':
+        # The external pooler owns the connections; pre-ping would just add a round trip
+        return {'poolclass': TimedNullPool}
+
+    settings = dict(POOL_PROFILES[profile])
+    for key, env_name in _OVERRIDES.items():
+        if os.getenv(env_name):
+            settings[key] = int(os.getenv(env_name))
+
+    options.update(settings)
+    options['poolclass'] = TimedQueuePool
+    return options
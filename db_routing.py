@@ -0,0 +1,92 @@
+"""
+Optional read-replica routing for the Flask-SQLAlchemy session.
+
+When DATABASE_REPLICA_URL is set it is registered as the 'replica' bind.
+GET/HEAD requests to read-heavy blueprints (REPLICA_BLUEPRINTS) then run their
+SELECTs against the replica; everything else, and every flush, uses the
+primary.
+
+Read-your-writes: when a request writes to the database, the user's session
+is pinned to the primary for REPLICA_STICKY_SECONDS, so e.g. the dashboard
+right after an enrollment never reads a lagging replica.
+
+Code can also choose explicitly:
+
+    with reads_from('replica'):
+        rows = ChatHistory.query.filter_by(user_id=user_id).all()
+"""
+import time
+from contextlib import contextmanager
+from flask import g, request, session, has_request_context, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = 'replica'
+DEFAULT_REPLICA_BLUEPRINTS = 'courses,lessons,dashboard,modules,chatbot'
+STICKY_SESSION_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the replica bind when the request allows it."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _reads_go_to_replica(clause):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _reads_go_to_replica(clause):
+    if not has_app_context() or g.get('db_route') != REPLICA_BIND:
+        return False
+    # Only plain SELECTs; anything after this request's first write stays on the primary
+    return isinstance(clause, Select) and not g.get('db_wrote')
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(db_session, flush_context):
+    if has_app_context():
+        g.db_wrote = True
+
+
+@contextmanager
+def reads_from(target):
+    """Route reads in this block to 'replica' or 'primary', regardless of the request."""
+    previous = g.get('db_route')
+    g.db_route = target
+    try:
+        yield
+    finally:
+        g.db_route = previous
+
+
+def configure_replica(app, replica_url):
+    """Register the replica bind and per-request routing hooks (no-op without a URL)."""
+    if not replica_url:
+        return
+    if replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds[REPLICA_BIND] = replica_url
+
+    blueprints = app.config.get('REPLICA_BLUEPRINTS') or DEFAULT_REPLICA_BLUEPRINTS
+    read_blueprints = {name.strip() for name in blueprints.split(',') if name.strip()}
+    sticky_seconds = float(app.config.get('REPLICA_STICKY_SECONDS', 10))
+
+    @app.before_request
+    def choose_read_route():
+        g.db_route = 'primary'
+        if request.method not in ('GET', 'HEAD') or request.blueprint not in read_blueprints:
+            return
+        if session.get(STICKY_SESSION_KEY, 0) > time.time():
+            return
+        g.db_route = REPLICA_BIND
+
+    @app.after_request
+    def pin_writer_to_primary(response):
+        if has_request_context() and g.get('db_wrote'):
+            session[STICKY_SESSION_KEY] = time.time() + sticky_seconds
+        return response
@@ -1,22 +1,37 @@
 import os
 import multiprocessing
+import tempfile
 
 # Server socket
 bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
 backlog = 2048
 
-# Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
+# Worker processes. Each worker holds its own DB pool (see db_pool.py), so
+# keep workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the Postgres limit.
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
 worker_class = 'sync'
 worker_connections = 1000
 timeout = 120
 keepalive = 5
 
+# Web workers use the 'gunicorn' connection pool profile
+os.environ.setdefault('DB_POOL_PROFILE', 'gunicorn')
+
+# Without Redis, workers share request metrics through per-worker files (see request_metrics.py)
+if not os.getenv('REDIS_URL'):
+    os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'innerwork-metrics'))
+
+# Load the app once in the master and fork workers from it (copy-on-write).
+# Inherited sockets are reset per worker in post_fork below.
+wsgi_app = 'wsgi:app'
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
 # Logging
 accesslog = '-'
 errorlog = '-'
 loglevel = 'info'
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+# %(L)s: request duration in seconds
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(L)ss'
 
 # Process naming
 proc_name = 'innerwork'
@@ -31,3 +46,35 @@ tmp_upload_dir = None
 
 # SSL (handled by Render)
 # Render provides HTTPS automatically
+
+
+# Server hooks
+def on_starting(server):
+    """Start request metrics from zero on every (re)deploy."""
+    from request_metrics import create_store
+    redis_client = None
+    if os.getenv('REDIS_URL'):
+        import redis
+        redis_client = redis.from_url(os.getenv('REDIS_URL'))
+    try:
+        create_store(os.getenv('METRICS_STORE'), redis_client, os.getenv('METRICS_DIR')).clear()
+    except Exception as e:
+        server.log.warning("Could not reset request metrics: %s", e)
+
+
+def post_fork(server, worker):
+    """Give each worker its own DB pool, Redis connections and OpenAI client."""
+    if not preload_app:
+        return
+    from app import reset_after_fork
+    from wsgi import app
+    reset_after_fork(app)
+    server.log.info("Worker %s: reset inherited connections", worker.pid)
+
+
+def worker_exit(server, worker):
+    """Publish the exiting worker's last request metrics."""
+    from wsgi import app
+    middleware = app.extensions.get('request_metrics')
+    if middleware is not None:
+        middleware.flush()
@@ -0,0 +1,214 @@
+"""
+Telemetry for chatbot LLM calls.
+
+Wrap each OpenAI call in llm_call():
+
+    with llm_call(model, context_messages=len(history)) as call:
+        for chunk in stream:
+            call.first_token()      # first content delta -> time to first token
+            ...
+        call.finish(usage, finish_reason)
+
+On exit it records time to first token, total latency, prompt / cached /
+completion tokens, finish reason and an estimated cost:
+
+- as Prometheus metrics on /metrics (see request_metrics.py), labelled by
+  model, cache status ('hit' when OpenAI served cached prompt tokens) and
+  outcome;
+- as an hourly LLMUsageRollup row (models.py), added to the current DB
+  session so it commits with the chat message;
+- as one INFO log line per call.
+
+Prices are USD per million tokens; LLM_PRICES (JSON, same shape as
+MODEL_PRICES) overrides or extends the table. It is parsed once at startup
+(init_llm_telemetry); if it is malformed the built-in table is used and a
+warning logged. Telemetry never fails the call it measures: any error while
+recording is logged and dropped.
+"""
+import json
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app
+from models import db, LLMUsageRollup
+from request_metrics import register_metric, worker_metrics
+
+# (input, cached input, output) USD per 1M tokens
+MODEL_PRICES = {
+    'gpt-4o-mini': (0.15, 0.075, 0.60),
+    'gpt-4o': (2.50, 1.25, 10.00),
+    'gpt-4.1-nano': (0.10, 0.025, 0.40),
+    'gpt-4.1-mini': (0.40, 0.10, 1.60),
+    'gpt-4.1': (2.00, 0.50, 8.00),
+}
+
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+
+register_metric('llm_requests_total', 'counter', 'Chatbot LLM calls by model, cache status and outcome.')
+register_metric('llm_truncated_total', 'counter', 'LLM replies cut off by max_tokens.')
+register_metric('llm_tokens_total', 'counter', 'LLM tokens by model and kind (prompt, cached, completion).')
+register_metric('llm_cost_usd_total', 'counter', 'Estimated LLM spend in USD.')
+register_metric('llm_time_to_first_token_seconds', 'histogram',
+                'Time from sending the request to the first streamed token.', LLM_LATENCY_BUCKETS)
+register_metric('llm_latency_seconds', 'histogram', 'Total LLM call time.', LLM_LATENCY_BUCKETS)
+register_metric('llm_context_messages', 'histogram', 'History messages sent with each call.',
+                (0, 2, 4, 6, 8, 10, 12))
+
+_prices = None
+
+
+def parse_prices(raw):
+    """MODEL_PRICES updated with the LLM_PRICES JSON in raw. Raises ValueError if it is malformed."""
+    prices = dict(MODEL_PRICES)
+    if not raw:
+        return prices
+    overrides = json.loads(raw)
+    if not isinstance(overrides, dict):
+        raise ValueError("expected an object of model name -> [input, cached input, output]")
+    for name, p in overrides.items():
+        if not isinstance(p, list) or len(p) != 3 or not all(_is_price(v) for v in p):
+            raise ValueError(f"price for {name!r} must be three non-negative numbers, got {p!r}")
+        prices[name] = tuple(float(v) for v in p)
+    return prices
+
+
+def _is_price(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and value >= 0
+
+
+def load_prices(logger=None):
+    """Parse LLM_PRICES into the price table, falling back to MODEL_PRICES if it is malformed."""
+    global _prices
+    try:
+        _prices = parse_prices(os.getenv('LLM_PRICES'))
+    except ValueError as e:  # json.JSONDecodeError is a ValueError
+        (logger or logging.getLogger(__name__)).warning(
+            "Ignoring LLM_PRICES, using the built-in price table: %s", e)
+        _prices = dict(MODEL_PRICES)
+    return _prices
+
+
+def init_llm_telemetry(app):
+    """Load the price table at startup so a bad LLM_PRICES is reported once, not on every call."""
+    load_prices(app.logger)
+
+
+def model_prices(model):
+    """(input, cached input, output) prices for a model, or None when unknown."""
+    if _prices is None:
+        load_prices()
+    if model in _prices:
+        return _prices[model]
+    # Dated snapshots (gpt-4o-mini-2024-07-18) cost the same as their alias
+    for name in sorted(_prices, key=len, reverse=True):
+        if model.startswith(name + '-'):
+            return _prices[name]
+    return None
+
+
+def estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens):
+    prices = model_prices(model)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+class LLMCall:
+    """Measurements for one LLM call, filled in while the response streams."""
+
+    def __init__(self, model, context_messages=0):
+        self.model = model
+        self.context_messages = context_messages
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.finish_reason = None
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self, usage, finish_reason=None):
+        """Take token counts from the API's usage object (may be None if the stream broke)."""
+        self.finish_reason = finish_reason
+        if usage is None:
+            return
+        self.prompt_tokens = usage.prompt_tokens or 0
+        self.completion_tokens = usage.completion_tokens or 0
+        details = getattr(usage, 'prompt_tokens_details', None)
+        self.cached_tokens = (getattr(details, 'cached_tokens', None) or 0) if details else 0
+
+
+def _record(call, outcome):
+    """Record one call's telemetry. Never raises: telemetry must never cost the user their reply."""
+    try:
+        _record_usage(call, outcome)
+    except Exception as e:
+        # Also covers a failed rollup upsert the savepoint couldn't contain:
+        # start a clean transaction (nothing is pending yet, the chat turn is
+        # added after the call)
+        current_app.logger.warning("Could not record LLM telemetry: %s", e)
+        db.session.rollback()
+
+
+def _record_usage(call, outcome):
+    latency = time.perf_counter() - call.started
+    ttft = (call.first_token_at - call.started) if call.first_token_at else latency
+    cache_status = 'hit' if call.cached_tokens else 'miss'
+    truncated = call.finish_reason == 'length'
+    cost = estimate_cost(call.model, call.prompt_tokens, call.cached_tokens, call.completion_tokens)
+
+    labels = {'model': call.model}
+    worker_metrics.inc('llm_requests_total', cache=cache_status, outcome=outcome, **labels)
+    if truncated:
+        worker_metrics.inc('llm_truncated_total', **labels)
+    for kind, tokens in (('prompt', call.prompt_tokens), ('cached', call.cached_tokens),
+                         ('completion', call.completion_tokens)):
+        if tokens:
+            worker_metrics.inc('llm_tokens_total', tokens, kind=kind, **labels)
+    worker_metrics.inc('llm_cost_usd_total', cost, **labels)
+    worker_metrics.observe('llm_latency_seconds', latency, **labels)
+    worker_metrics.observe('llm_context_messages', call.context_messages, **labels)
+    if outcome == 'ok':
+        worker_metrics.observe('llm_time_to_first_token_seconds', ttft, **labels)
+
+    current_app.logger.info(
+        "LLM call model=%s outcome=%s cache=%s ttft=%.0fms latency=%.0fms tokens=%d/%d (cached %d) "
+        "finish=%s context=%d cost=$%.6f",
+        call.model, outcome, cache_status, ttft * 1000, latency * 1000, call.prompt_tokens,
+        call.completion_tokens, call.cached_tokens, call.finish_reason, call.context_messages, cost,
+    )
+
+    # Savepoint: a failed upsert (e.g. the table is missing) must not abort
+    # the request's transaction, which still has to save the chat turn
+    with db.session.begin_nested():
+        LLMUsageRollup.record(
+            datetime.utcnow().replace(minute=0, second=0, microsecond=0), call.model, cache_status, outcome,
+            truncated=int(truncated),
+            prompt_tokens=call.prompt_tokens,
+            cached_tokens=call.cached_tokens,
+            completion_tokens=call.completion_tokens,
+            cost_usd=cost,
+            latency_ms_total=latency * 1000,
+            latency_ms_max=latency * 1000,
+            ttft_ms_total=ttft * 1000,
+        )
+
+
+@contextmanager
+def llm_call(model, context_messages=0):
+    """Time an LLM call and record its telemetry when the block exits."""
+    call = LLMCall(model, context_messages)
+    try:
+        yield call
+    except Exception:
+        _record(call, 'error')
+        raise
+    _record(call, 'ok')
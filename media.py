@@ -0,0 +1,254 @@
+"""
+Streaming media for the Virtual Debbie / Elliott widgets.
+
+Audio and video under static/media are served from /media/<name> instead of
+/static or /assets:
+
+- HTTP Range requests are honoured (206 Partial Content), so seeking or
+  resuming a clip fetches only the bytes it needs.
+- The body is the open file handed to the server's wsgi.file_wrapper, which
+  gunicorn sends with sendfile(): the worker never reads the file into memory.
+- A request for a .wav gets a compressed sibling when one exists next to it
+  (Greeting1.wav -> Greeting1.mp3, or .opus for clients that advertise Ogg
+  support). Add ?format=wav to force the original.
+
+Templates call media_url('virtualelliott.mp4'), which points at the
+fingerprinted copy from the asset manifest when there is one (served with an
+immutable Cache-Control) and at the plain file otherwise. Variants written by
+transcode_media.py (static/media/encoded/manifest.json) are listed by
+media_variants() and preferred for .wav requests.
+"""
+import json
+import mimetypes
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from flask import Blueprint, current_app, request, url_for, abort
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+from assets import STATIC_DIR, DIST_DIR, IMMUTABLE_CACHE_CONTROL, load_manifest
+
+MEDIA_DIR = os.path.join(STATIC_DIR, 'media')
+DIST_MEDIA_DIR = os.path.join(DIST_DIR, 'media')
+ENCODED_SUBDIR = 'encoded'
+VARIANTS_MANIFEST_PATH = os.path.join(MEDIA_DIR, ENCODED_SUBDIR, 'manifest.json')
+
+MEDIA_CACHE_CONTROL = 'public, max-age=3600'
+CHUNK_SIZE = 64 * 1024
+
+# Compressed stand-ins for WAV, in order of preference
+COMPRESSED_AUDIO = ('.opus', '.mp3')
+OPUS_ACCEPT_TYPES = {'audio/ogg', 'audio/opus', 'audio/webm'}
+HIGH_DENSITY_MEDIA_QUERY = '(min-resolution: 2dppx)'
+
+# mimetypes doesn't know every format we ship
+MEDIA_TYPES = {
+    '.opus': 'audio/ogg',
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.webp': 'image/webp',
+    '.gif': 'image/gif',
+}
+
+media_bp = Blueprint('media', __name__, url_prefix='/media')
+
+_variants = None
+
+
+def _media_type(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return MEDIA_TYPES.get(ext) or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+@lru_cache(maxsize=8)
+def _directory_index(directory, mtime):
+    """Case-insensitive name lookup (MicroPractice.wav sits next to Micropractice.mp3)."""
+    return {name.lower(): name for name in os.listdir(directory)}
+
+
+def _find_sibling(directory, filename, suffix):
+    try:
+        index = _directory_index(directory, os.stat(directory).st_mtime)
+    except OSError:
+        return None
+    root = os.path.splitext(filename)[0]
+    return index.get((root + suffix).lower())
+
+
+def _accepts_opus():
+    return any(value in OPUS_ACCEPT_TYPES and quality > 0 for value, quality in request.accept_mimetypes)
+
+
+def load_variants():
+    """Return the transcoded variants manifest ({} when transcode_media.py hasn't run)."""
+    global _variants
+    if _variants is None:
+        try:
+            with open(VARIANTS_MANIFEST_PATH) as f:
+                _variants = json.load(f)
+        except (OSError, ValueError):
+            _variants = {}
+    return _variants
+
+
+def _encoded_sources(filename):
+    return load_variants().get(filename, {}).get('sources', [])
+
+
+def compressed_variant(filename, allow_opus=False):
+    """Path (relative to static/media) of the best compressed stand-in for a .wav file.
+
+    Transcoded variants win over hand-made siblings; anything else is returned as is.
+    """
+    if os.path.splitext(filename)[1].lower() != '.wav':
+        return filename
+    for suffix in COMPRESSED_AUDIO:
+        if suffix == '.opus' and not allow_opus:
+            continue
+        for source in _encoded_sources(filename):
+            if source['file'].endswith(suffix):
+                return f"{ENCODED_SUBDIR}/{source['file']}"
+        sibling = _find_sibling(MEDIA_DIR, filename, suffix)
+        if sibling:
+            return sibling
+    return filename
+
+
+def media_url(filename, **values):
+    """URL for a file under static/media, preferring compressed audio and fingerprinted copies."""
+    # Pages embedding this are cached for everyone, so only pick formats every browser plays
+    filename = compressed_variant(filename)
+    hashed = load_manifest().get(f'media/{filename}')
+    if hashed is not None:
+        filename = hashed[len('media/'):]
+    return url_for('media.media_file', filename=filename, **values)
+
+
+def media_variants(filename):
+    """Transcoded variants of a media file, grouped into 'video', 'image' and 'audio'.
+
+    Each entry has url, type and media (a density query, or None); entries are
+    ordered lightest first, so a template can list them as <source> elements and
+    let the browser take the first format it supports.
+    """
+    groups = {'video': [], 'image': [], 'audio': []}
+    for source in _encoded_sources(filename):
+        kind = source['type'].split('/', 1)[0]
+        if kind in groups:
+            groups[kind].append({
+                'url': media_url(f"{ENCODED_SUBDIR}/{source['file']}"),
+                'type': source['type'],
+                'media': HIGH_DENSITY_MEDIA_QUERY if source.get('density', 1) > 1 else None,
+            })
+    return groups
+
+
+def _read_range(f, length):
+    """Yield `length` bytes from f's current position, then close it."""
+    try:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _file_body(f, start, length, size):
+    f.seek(start)
+    # gunicorn's file wrapper sends exactly Content-Length bytes from the current
+    # offset with sendfile(); other wrappers stream to EOF, which is only right
+    # when the range runs to the end of the file
+    if start + length == size or request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn'):
+        return wrap_file(request.environ, f, CHUNK_SIZE)
+    return _read_range(f, length)
+
+
+def _range_bounds(size, etag, last_modified):
+    """(start, stop) for a satisfiable single Range, None to send the whole file.
+
+    Raises 416 for a range that lies outside the file.
+    """
+    byte_range = request.range
+    if byte_range is None or byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        return None
+
+    # If-Range: only honour the range if the client's copy is still current
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None and if_range.date < last_modified:
+        return None
+
+    bounds = byte_range.range_for_length(size)
+    if bounds is None:
+        response = current_app.response_class(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+        abort(response)
+    return bounds
+
+
+def send_media(path, mimetype, cache_control):
+    """Stream a media file with Range, ETag and Last-Modified support."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        abort(404)
+    size = stat.st_size
+    etag = f'{int(stat.st_mtime):x}-{size:x}'
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = cache_control
+    response.set_etag(etag)
+    response.last_modified = last_modified
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    bounds = _range_bounds(size, etag, last_modified)
+    start, stop = bounds if bounds else (0, size)
+    length = stop - start
+
+    response.response = _file_body(open(path, 'rb'), start, length, size)
+    response.direct_passthrough = True
+    response.content_length = length
+    if bounds:
+        response.status_code = 206
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    return response
+
+
+@media_bp.route('/<path:filename>')
+def media_file(filename):
+    """Serve a fingerprinted or plain media file, with compressed audio negotiation."""
+    hashed_path = safe_join(DIST_MEDIA_DIR, filename)
+    if hashed_path and os.path.isfile(hashed_path):
+        return send_media(hashed_path, _media_type(filename), IMMUTABLE_CACHE_CONTROL)
+
+    if request.args.get('format') == 'wav':
+        served = filename
+    else:
+        served = compressed_variant(filename, allow_opus=_accepts_opus())
+
+    path = safe_join(MEDIA_DIR, served)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    response = send_media(path, _media_type(served), MEDIA_CACHE_CONTROL)
+    if os.path.splitext(filename)[1].lower() == '.wav':
+        response.vary.add('Accept')
+    return response
+
+
+def init_media(app):
+    app.register_blueprint(media_bp)
+    app.add_template_global(media_url)
+    app.add_template_global(media_variants)
@@ -0,0 +1,292 @@
+"""
+Versioned, online schema migrations for SQLite and PostgreSQL.
+
+Each migration is a function registered with @migration(version, description)
+and is applied in order by `flask --app wsgi migrate` (or init-db); the
+version reached is stamped in schema_version after every step, see schema.py.
+
+Migrations are written with the MigrationContext operations below. They are
+individually idempotent and each runs in its own short transaction, so a
+migration interrupted halfway can simply be run again, and nothing holds a
+long lock on a big table:
+
+    add_column    ALTER TABLE ... ADD COLUMN (nullable or constant default:
+                  no table rewrite), with a short lock_timeout and retries on
+                  PostgreSQL so it never queues behind long transactions
+    create_index  CREATE INDEX CONCURRENTLY on PostgreSQL (outside a
+                  transaction; an invalid leftover from a failed build is
+                  dropped and rebuilt), plain CREATE INDEX on SQLite
+    create_table  create a model's table (and its indexes) if missing
+    execute       any other statement, in its own transaction
+    backfill      UPDATE in primary-key ranges of batch_size rows, committing
+                  and sleeping `throttle` seconds between batches, with progress
+    batched       the same batching around any per-range function
+
+When adding a migration: bump SCHEMA_VERSION in schema.py to its version and
+make models.py describe the end state, so fresh databases get the same schema
+from create_all().
+"""
+import time
+from collections import namedtuple
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from models import db
+
+Migration = namedtuple('Migration', 'version description apply')
+
+MIGRATIONS = []
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_THROTTLE_SECONDS = 0.05
+LOCK_TIMEOUT = '5s'
+LOCK_RETRIES = 5
+
+
+def migration(version, description):
+    """Register a migration; versions must be added in increasing order."""
+    def decorator(apply):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} must come after {MIGRATIONS[-1].version}")
+        MIGRATIONS.append(Migration(version, description, apply))
+        return apply
+    return decorator
+
+
+def pending_migrations(current, target=None):
+    return [m for m in MIGRATIONS if m.version > (current or 0) and (target is None or m.version <= target)]
+
+
+class MigrationContext:
+    """Schema operations that are safe to run against a live database."""
+
+    def __init__(self, engine, batch_size=DEFAULT_BATCH_SIZE, throttle=DEFAULT_THROTTLE_SECONDS, echo=print):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.echo = echo
+
+    # -- introspection ------------------------------------------------------
+
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return self.has_table(table) and column in {c['name'] for c in inspect(self.engine).get_columns(table)}
+
+    def has_index(self, table, name):
+        return self.has_table(table) and name in {i['name'] for i in inspect(self.engine).get_indexes(table)}
+
+    # -- operations ---------------------------------------------------------
+
+    def execute(self, sql, **params):
+        """Run one statement in its own transaction."""
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params)
+
+    def _ddl(self, sql):
+        if self.dialect != 'postgresql':
+            self.execute(sql)
+            return
+        # Fail fast instead of queueing behind a long transaction (and blocking
+        # every query queued behind us); retry with backoff
+        for attempt in range(1, LOCK_RETRIES + 1):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                    conn.execute(text(sql))
+                return
+            except OperationalError as e:
+                if getattr(e.orig, 'pgcode', None) != '55P03' or attempt == LOCK_RETRIES:
+                    raise
+                self.echo(f"    lock not available, retrying ({attempt}/{LOCK_RETRIES})")
+                time.sleep(2 ** attempt)
+
+    def add_column(self, table, column, ddl_type):
+        """Add a column unless it exists; ddl_type may include a constant DEFAULT."""
+        if self.has_column(table, column):
+            self.echo(f"  - {table}.{column} already exists")
+            return
+        self._ddl(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")
+        self.echo(f"  ✓ Added {table}.{column}")
+
+    def create_table(self, model):
+        if self.has_table(model.__tablename__):
+            self.echo(f"  - {model.__tablename__} already exists")
+            return
+        model.__table__.create(self.engine)
+        self.echo(f"  ✓ Created {model.__tablename__}")
+
+    def create_index(self, name, table, columns, unique=False, using=None):
+        """Build an index without blocking writes (CONCURRENTLY on PostgreSQL).
+
+        columns may also be expressions; `using` (e.g. 'gin') is PostgreSQL only.
+        """
+        unique_sql = 'UNIQUE ' if unique else ''
+        column_sql = ', '.join(columns)
+        if self.dialect != 'postgresql':
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql})")
+            self.echo(f"  ✓ Index {name}")
+            return
+
+        # CONCURRENTLY can't run inside a transaction block
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            valid = conn.execute(text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+            ), {'name': name}).scalar()
+            if valid:
+                self.echo(f"  - Index {name} already exists")
+                return
+            if valid is False:
+                # Left behind by an interrupted concurrent build
+                self.echo(f"    dropping invalid index {name}")
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            started = time.perf_counter()
+            using_sql = f'USING {using} ' if using else ''
+            conn.execute(text(f"CREATE {unique_sql}INDEX CONCURRENTLY {name} ON {table} {using_sql}({column_sql})"))
+        self.echo(f"  ✓ Index {name} ({time.perf_counter() - started:.1f}s, concurrently)")
+
+    def batched(self, table, apply, where_sql='1=1', key='id', label='rows', **params):
+        """Call apply(start, end) for each [start, end) range of batch_size key values.
+
+        apply does one short unit of work for the range and returns how many
+        rows it touched; progress is echoed after each range and `throttle`
+        seconds are slept between them. Returns the total, or None when the
+        table has no matching rows.
+        """
+        with self.engine.connect() as conn:
+            low, high = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table} WHERE {where_sql}"),
+                                     params).one()
+        if low is None:
+            return None
+
+        total = 0
+        started = time.perf_counter()
+        span = high - low + 1
+        for start in range(low, high + 1, self.batch_size):
+            end = start + self.batch_size
+            total += apply(start, end)
+            done = min(end, high + 1) - low
+            self.echo(f"    {table}: {total:,} {label}, {done / span:.0%} of key range "
+                      f"({time.perf_counter() - started:.1f}s)")
+            if self.throttle and end <= high:
+                time.sleep(self.throttle)
+        return total
+
+    def backfill(self, table, set_sql, where_sql='1=1', key='id', **params):
+        """UPDATE table SET set_sql WHERE where_sql, batch_size key values at a time.
+
+        Batches walk the primary key range, so each one is a short indexed
+        UPDATE that commits on its own; `throttle` seconds between batches
+        leave room for production traffic (and replicas to catch up).
+        """
+        def update(start, end):
+            result = self.execute(
+                f"UPDATE {table} SET {set_sql} WHERE {key} >= :_start AND {key} < :_end AND ({where_sql})",
+                _start=start, _end=end, **params
+            )
+            return max(result.rowcount or 0, 0)
+
+        updated = self.batched(table, update, where_sql, key, label='rows updated', **params)
+        if updated is None:
+            self.echo(f"  - {table}: nothing to backfill")
+            return 0
+        self.echo(f"  ✓ Backfilled {updated:,} {table} row(s)")
+        return updated
+
+
+# ---------------------------------------------------------------------------
+# Migrations. Keep models.py in sync with the end state of each one.
+#
+# Numbering starts at 3: before migrations existed, init_schema() stamped
+# version 1 (create_all baseline) and then 2 (llm_usage_rollup) on existing
+# databases without altering any table, so those numbers are taken.
+# ---------------------------------------------------------------------------
+
+@migration(3, 'Module pricing and quiz version columns (was migrate_db.py)')
+def add_module_columns(ctx):
+    ctx.add_column('modules', 'price_cents', 'INTEGER DEFAULT 5900')
+    ctx.add_column('modules', 'duration_label', "VARCHAR(50) DEFAULT '4 Modules'")
+    ctx.add_column('modules', 'updated_at', 'TIMESTAMP')
+    ctx.backfill('modules', 'updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)', 'updated_at IS NULL')
+    from models import Enrollment
+    ctx.create_table(Enrollment)
+
+
+@migration(4, 'LLM usage rollup table')
+def add_llm_usage_rollup(ctx):
+    from models import LLMUsageRollup
+    ctx.create_table(LLMUsageRollup)
+
+
+@migration(5, 'Per-user indexes on chat history, enrollments, purchases and progress')
+def add_user_indexes(ctx):
+    ctx.create_index('ix_chat_history_user_timestamp', 'chat_history', ['user_id', 'timestamp'])
+    ctx.create_index('ix_enrollments_user_module', 'enrollments', ['user_id', 'module_id'])
+    ctx.create_index('ix_purchases_user_module', 'purchases', ['user_id', 'module_id'])
+    ctx.create_index('ix_progress_user_module', 'progress', ['user_id', 'module_id'])
+
+
+@migration(6, 'Chat history archive table')
+def add_chat_archive(ctx):
+    from models import ChatArchive
+    ctx.create_table(ChatArchive)
+
+
+def _build_chat_fts(ctx, drop_first=False):
+    """(Re)create the SQLite chat FTS5 table and its triggers and index every turn."""
+    from models import CHAT_FTS_DDL, CHAT_FTS_DROP, CHAT_FTS_TABLE
+    # Drop, create, triggers and initial load in one transaction, so no turn is missed
+    started = time.perf_counter()
+    with ctx.engine.begin() as conn:
+        if drop_first:
+            for statement in CHAT_FTS_DROP:
+                conn.exec_driver_sql(statement)
+        for statement in CHAT_FTS_DDL:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql(f"INSERT INTO {CHAT_FTS_TABLE}({CHAT_FTS_TABLE}) VALUES ('rebuild')")
+    ctx.echo(f"  ✓ Created {CHAT_FTS_TABLE} ({time.perf_counter() - started:.1f}s)")
+
+
+@migration(7, 'Full-text search over chat history')
+def add_chat_search(ctx):
+    from models import CHAT_FTS_TABLE, CHAT_SEARCH_DOCUMENT
+    if ctx.dialect == 'postgresql':
+        ctx.create_index('ix_chat_history_search', 'chat_history', [CHAT_SEARCH_DOCUMENT], using='gin')
+        return
+    if ctx.dialect != 'sqlite':
+        ctx.echo(f"  - No full-text index for {ctx.dialect}; chat search is unavailable")
+        return
+    if ctx.has_table(CHAT_FTS_TABLE):
+        ctx.echo(f"  - {CHAT_FTS_TABLE} already exists")
+        return
+    _build_chat_fts(ctx)
+
+
+@migration(8, 'Backfill user_course_summary from purchases, enrollments and progress')
+def backfill_course_summary(ctx):
+    from models import UserCourseSummary
+
+    def rebuild(start, end):
+        rows = UserCourseSummary.rebuild(user_ids=(start, end))
+        db.session.commit()
+        return rows
+
+    rows = ctx.batched('users', rebuild, label='summary rows')
+    ctx.echo(f"  ✓ {rows or 0:,} user_course_summary row(s)")
+
+
+@migration(9, 'Per-user owner column in the SQLite chat search index')
+def add_chat_fts_owner(ctx):
+    from models import CHAT_FTS_TABLE
+    if ctx.dialect != 'sqlite':
+        ctx.echo(f"  - Nothing to do on {ctx.dialect}")
+        return
+    with ctx.engine.connect() as conn:
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({CHAT_FTS_TABLE})")}
+    if 'owner' in columns:
+        ctx.echo(f"  - {CHAT_FTS_TABLE}.owner already exists")
+        return
+    # FTS5 can't add a column: rebuild the table. New chat turns wait on the
+    # write lock meanwhile (about 3 minutes per 7M turns)
+    _build_chat_fts(ctx, drop_first=True)
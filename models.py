@@ -2,8 +2,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import event
+from db_routing import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession sends read-only requests to DATABASE_REPLICA_URL when configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -19,6 +22,7 @@ class User(UserMixin, db.Model):
     purchases = db.relationship('Purchase', backref='user', lazy=True)
     chat_history = db.relationship('ChatHistory', backref='user', lazy=True)
     enrollments = db.relationship('Enrollment', backref='user', lazy=True)
+    course_summaries = db.relationship('UserCourseSummary', backref='user', lazy=True)
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -41,18 +45,41 @@ class Module(db.Model):
     price_cents = db.Column(db.Integer, default=5900)  # Price in cents ($59.00 default)
     duration_label = db.Column(db.String(50), default="4 Modules")  # e.g. "4 Modules", "6 Lessons"
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Quiz cache version stamp
     
     # Relationships
     progress = db.relationship('Progress', backref='module', lazy=True)
     purchases = db.relationship('Purchase', backref='module', lazy=True)
     enrollments = db.relationship('Enrollment', backref='module', lazy=True)
     
+    @classmethod
+    def sync_catalog(cls, courses):
+        """Add rows for catalog courses (routes.courses.courses_data) missing from the table.
+        
+        Purchases and enrollments reference modules.id, so bulk tools call this
+        before inserting them. Returns the number of rows added; does not commit.
+        """
+        existing = {row[0] for row in db.session.query(cls.id)}
+        missing = [course for course in courses if course['id'] not in existing]
+        for course in missing:
+            db.session.add(cls(
+                id=course['id'],
+                title=course['title'],
+                description=course['description'],
+                price_cents=course['price_cents'],
+                duration_label=course.get('duration')
+            ))
+        return len(missing)
+    
     def __repr__(self):
         return f'<Module {self.title}>'
 
 
 class Progress(db.Model):
     __tablename__ = 'progress'
+    __table_args__ = (
+        db.Index('ix_progress_user_module', 'user_id', 'module_id'),  # Added by migration 5
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -66,6 +93,9 @@ class Progress(db.Model):
 
 class Purchase(db.Model):
     __tablename__ = 'purchases'
+    __table_args__ = (
+        db.Index('ix_purchases_user_module', 'user_id', 'module_id'),  # Added by migration 5
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -81,6 +111,9 @@ class Purchase(db.Model):
 
 class Enrollment(db.Model):
     __tablename__ = 'enrollments'
+    __table_args__ = (
+        db.Index('ix_enrollments_user_module', 'user_id', 'module_id'),  # Added by migration 5
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -93,8 +126,52 @@ class Enrollment(db.Model):
         return f'<Enrollment User:{self.user_id} Module:{self.module_id} Progress:{self.progress}%>'
 
 
+# Full-text search over chat turns (see chat_search.py). PostgreSQL indexes
+# this tsvector expression directly (queries must repeat it verbatim to use
+# the index); SQLite keeps an external-content FTS5 table in step with
+# triggers. Existing databases get both from migration 7 (the FTS5 owner
+# column from migration 9).
+#
+# The FTS5 table also indexes an owner token, 'u<user_id>', so a search can
+# match `owner:u42 AND (...)` and FTS5 intersects the user's postings list
+# instead of collecting every user's hits. Its content comes from a view
+# that adds that column to chat_history.
+CHAT_SEARCH_DOCUMENT = "to_tsvector('english', message || ' ' || response)"
+CHAT_FTS_TABLE = 'chat_history_fts'
+CHAT_FTS_SOURCE = 'chat_history_fts_source'
+CHAT_FTS_DDL = (
+    f"CREATE VIEW IF NOT EXISTS {CHAT_FTS_SOURCE} AS "
+    "SELECT id, message, response, 'u' || user_id AS owner FROM chat_history",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {CHAT_FTS_TABLE} USING fts5(message, response, owner, "
+    f"content='{CHAT_FTS_SOURCE}', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS chat_history_fts_insert AFTER INSERT ON chat_history BEGIN "
+    f"INSERT INTO {CHAT_FTS_TABLE}(rowid, message, response, owner) "
+    f"VALUES (new.id, new.message, new.response, 'u' || new.user_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS chat_history_fts_delete AFTER DELETE ON chat_history BEGIN "
+    f"INSERT INTO {CHAT_FTS_TABLE}({CHAT_FTS_TABLE}, rowid, message, response, owner) "
+    f"VALUES ('delete', old.id, old.message, old.response, 'u' || old.user_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS chat_history_fts_update AFTER UPDATE OF message, response, user_id "
+    f"ON chat_history BEGIN "
+    f"INSERT INTO {CHAT_FTS_TABLE}({CHAT_FTS_TABLE}, rowid, message, response, owner) "
+    f"VALUES ('delete', old.id, old.message, old.response, 'u' || old.user_id); "
+    f"INSERT INTO {CHAT_FTS_TABLE}(rowid, message, response, owner) "
+    f"VALUES (new.id, new.message, new.response, 'u' || new.user_id); END",
+)
+CHAT_FTS_DROP = (
+    "DROP TRIGGER IF EXISTS chat_history_fts_insert",
+    "DROP TRIGGER IF EXISTS chat_history_fts_delete",
+    "DROP TRIGGER IF EXISTS chat_history_fts_update",
+    f"DROP TABLE IF EXISTS {CHAT_FTS_TABLE}",
+    f"DROP VIEW IF EXISTS {CHAT_FTS_SOURCE}",
+)
+
 class ChatHistory(db.Model):
     __tablename__ = 'chat_history'
+    __table_args__ = (
+        db.Index('ix_chat_history_user_timestamp', 'user_id', 'timestamp'),  # Added by migration 5
+        db.Index('ix_chat_history_search', db.text(CHAT_SEARCH_DOCUMENT),
+                 postgresql_using='gin').ddl_if(dialect='postgresql'),  # Added by migration 7
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -104,3 +181,263 @@ class ChatHistory(db.Model):
     
     def __repr__(self):
         return f'<ChatHistory User:{self.user_id} at {self.timestamp}>'
+
+
+@event.listens_for(ChatHistory.__table__, 'after_create')
+def create_chat_fts(table, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in CHAT_FTS_DDL:
+            connection.exec_driver_sql(statement)
+
+
+@event.listens_for(ChatHistory.__table__, 'before_drop')
+def drop_chat_fts(table, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in CHAT_FTS_DROP:
+            connection.exec_driver_sql(statement)
+
+
+class ChatArchive(db.Model):
+    """Compressed JSONL of one user's chat turns from a closed period (see chat_archive.py).
+    
+    Turns move here from chat_history once they fall outside the hot window;
+    /chatbot/history reads them back transparently.
+    """
+    __tablename__ = 'chat_archive'
+    __table_args__ = (
+        db.Index('ix_chat_archive_user_period', 'user_id', 'period_end'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    period_start = db.Column(db.DateTime, nullable=False)  # Timestamp of the first turn in the blob
+    period_end = db.Column(db.DateTime, nullable=False)  # Timestamp of the last turn in the blob
+    turn_count = db.Column(db.Integer, nullable=False)
+    codec = db.Column(db.String(10), nullable=False)  # 'zstd' or 'gzip'
+    raw_bytes = db.Column(db.Integer, nullable=False)  # Uncompressed JSONL size
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ChatArchive User:{self.user_id} {self.period_start:%Y-%m-%d}..{self.period_end:%Y-%m-%d} ({self.turn_count})>'
+
+
+class UserCourseSummary(db.Model):
+    """Denormalized per-user, per-course progress row.
+
+    Written in the same transaction as Progress, Enrollment and Purchase
+    changes so read paths can use one narrow row instead of merging tables.
+    """
+    __tablename__ = 'user_course_summary'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'module_id', name='uq_user_course_summary_user_module'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    module_id = db.Column(db.Integer, nullable=False, index=True)  # No FK: courses may only exist in courses_data
+    enrolled = db.Column(db.Boolean, default=False, nullable=False)  # Has an Enrollment row
+    purchased = db.Column(db.Boolean, default=False, nullable=False)  # Has a completed Purchase row
+    progress = db.Column(db.Integer, default=0)  # Mirrors Enrollment.progress (0-100)
+    status = db.Column(db.String(20), default='in_progress')  # Mirrors Enrollment.status
+    quiz_score = db.Column(db.Integer)  # Mirrors Progress.score
+    quiz_completed_at = db.Column(db.DateTime)  # Mirrors Progress.completed_date
+    enrolled_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def has_access(self):
+        return self.enrolled or self.purchased
+    
+    @property
+    def has_progress(self):
+        """True when the old dashboard would have shown a progress entry."""
+        return self.quiz_score is not None or self.enrolled
+    
+    @property
+    def score(self):
+        """Quiz score when available, otherwise enrollment percent (template compatible)."""
+        return self.quiz_score if self.quiz_score is not None else self.progress
+    
+    @property
+    def completed_date(self):
+        return self.quiz_completed_at or self.enrolled_at or self.updated_at
+    
+    @classmethod
+    def upsert(cls, user_id, module_id):
+        """Return the summary row for (user, module), inserting a blank one if new.
+        
+        The blank row goes in with INSERT ... ON CONFLICT DO NOTHING and is
+        then selected, so two requests creating the same pair at once (batch
+        progress, a purchase, a quiz) both get the row instead of one hitting
+        the unique constraint. Does not commit: callers update the row and
+        commit together with the source-of-truth change.
+        """
+        summary = cls.query.filter_by(user_id=user_id, module_id=module_id).first()
+        if summary is not None:
+            return summary
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        blank = cls.blank(user_id, module_id)
+        values = {name: getattr(blank, name) for name in ('user_id', 'module_id', 'enrolled', 'purchased',
+                                                          'progress', 'status')}
+        db.session.execute(insert(cls.__table__).values(**values).on_conflict_do_nothing(
+            index_elements=['user_id', 'module_id']
+        ))
+        return cls.query.filter_by(user_id=user_id, module_id=module_id).one()
+    
+    @classmethod
+    def blank(cls, user_id, module_id):
+        return cls(
+            user_id=user_id,
+            module_id=module_id,
+            enrolled=False,
+            purchased=False,
+            progress=0,
+            status='in_progress'
+        )
+    
+    @classmethod
+    def _apply_sources(cls, row, user_id=None, module_id=None, user_ids=None):
+        """Fill summaries from Enrollment, completed Purchase and Progress rows.
+        
+        row(user_id, module_id) returns the summary to update. Filters: one
+        user, one module, or a [start, end) range of user ids.
+        """
+        def scoped(model):
+            query = model.query
+            if user_id is not None:
+                query = query.filter(model.user_id == user_id)
+            if module_id is not None:
+                query = query.filter(model.module_id == module_id)
+            if user_ids is not None:
+                query = query.filter(model.user_id >= user_ids[0], model.user_id < user_ids[1])
+            return query
+        
+        for enrollment in scoped(Enrollment).all():
+            summary = row(enrollment.user_id, enrollment.module_id)
+            summary.enrolled = True
+            summary.progress = enrollment.progress or 0
+            summary.status = enrollment.status
+            summary.enrolled_at = enrollment.created_at
+        
+        for purchase in scoped(Purchase).filter(Purchase.payment_status == 'completed').all():
+            summary = row(purchase.user_id, purchase.module_id)
+            summary.purchased = True
+            if summary.enrolled_at is None:
+                summary.enrolled_at = purchase.created_at
+        
+        for progress in scoped(Progress).all():
+            summary = row(progress.user_id, progress.module_id)
+            summary.quiz_score = progress.score
+            summary.quiz_completed_at = progress.completed_date
+    
+    @classmethod
+    def rebuild(cls, user_id=None, user_ids=None):
+        """Recompute summary rows from Progress, Enrollment and Purchase.
+        
+        Used to backfill existing data (migration 8); pass user_id for one
+        user or user_ids=(start, end) for a range. Does not commit.
+        """
+        query = cls.query
+        if user_id is not None:
+            query = query.filter(cls.user_id == user_id)
+        if user_ids is not None:
+            query = query.filter(cls.user_id >= user_ids[0], cls.user_id < user_ids[1])
+        summaries = {(s.user_id, s.module_id): s for s in query.all()}
+        
+        def row(uid, mid):
+            key = (uid, mid)
+            if key not in summaries:
+                summaries[key] = cls.blank(uid, mid)
+                db.session.add(summaries[key])
+            return summaries[key]
+        
+        cls._apply_sources(row, user_id=user_id, user_ids=user_ids)
+        return len(summaries)
+    
+    @classmethod
+    def for_user(cls, user_id, module_id=None):
+        """The user's summary rows (only module_id's when given).
+        
+        Falls back to computing them from Enrollment, Purchase and Progress,
+        without saving, when the user has none yet: databases upgraded
+        before migration 8 had backfilled the table.
+        """
+        query = cls.query.filter(cls.user_id == user_id)
+        if module_id is not None:
+            query = query.filter(cls.module_id == module_id)
+        summaries = query.all()
+        if summaries:
+            return summaries
+        
+        computed = {}
+        
+        def row(uid, mid):
+            if mid not in computed:
+                computed[mid] = cls.blank(uid, mid)
+            return computed[mid]
+        
+        cls._apply_sources(row, user_id=user_id, module_id=module_id)
+        return list(computed.values())
+
+
+class LLMUsageRollup(db.Model):
+    """Hourly totals of chatbot LLM calls per model, cache status and outcome.
+
+    One row per bucket, incremented in place by record(); query it directly for
+    spend and latency trends (averages = *_ms_total / requests).
+    """
+    __tablename__ = 'llm_usage_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('period_start', 'model', 'cache_status', 'outcome', name='uq_llm_usage_rollup_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period_start = db.Column(db.DateTime, nullable=False, index=True)  # UTC, truncated to the hour
+    model = db.Column(db.String(100), nullable=False)
+    cache_status = db.Column(db.String(10), nullable=False)  # 'hit' when OpenAI served cached prompt tokens
+    outcome = db.Column(db.String(10), nullable=False)  # 'ok' or 'error'
+    requests = db.Column(db.Integer, default=0, nullable=False)
+    truncated = db.Column(db.Integer, default=0, nullable=False)  # Stopped by max_tokens (finish_reason='length')
+    prompt_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    cached_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    completion_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    cost_usd = db.Column(db.Float, default=0.0, nullable=False)
+    latency_ms_total = db.Column(db.Float, default=0.0, nullable=False)
+    latency_ms_max = db.Column(db.Float, default=0.0, nullable=False)
+    ttft_ms_total = db.Column(db.Float, default=0.0, nullable=False)
+    
+    @classmethod
+    def record(cls, period_start, model, cache_status, outcome, **totals):
+        """Add one call's totals to its bucket with a single INSERT ... ON CONFLICT.
+        
+        Does not commit: the chatbot commits it together with the ChatHistory row
+        (llm_telemetry runs it in a savepoint, so a failure here can't lose that row).
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            greatest = db.func.greatest
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+            greatest = db.func.max  # SQLite's two-argument max() is scalar
+        
+        values = dict(period_start=period_start, model=model, cache_status=cache_status, outcome=outcome,
+                      requests=1, **totals)
+        stmt = insert(cls.__table__).values(**values)
+        table = cls.__table__.c
+        updates = {
+            name: (greatest(table[name], stmt.excluded[name]) if name == 'latency_ms_max'
+                   else table[name] + stmt.excluded[name])
+            for name in ['requests'] + list(totals)
+        }
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['period_start', 'model', 'cache_status', 'outcome'],
+            set_=updates,
+        ))
+    
+    def __repr__(self):
+        return f'<LLMUsageRollup {self.period_start:%Y-%m-%d %H}:00 {self.model} {self.outcome}>'
@@ -0,0 +1,198 @@
+"""
+Response cache and conditional GET for public catalog pages.
+
+Views decorated with @cached_page are rendered once per (catalog version,
+audience, path) and then served from memory or Redis. Two audiences are
+cached separately because only the navbar differs between them: 'anon' and
+'member'. Anything user-specific (purchased badges, Start Lessons buttons)
+is filled in client-side from /courses/access, so the page itself is the
+same for every member.
+
+Every cached response carries an ETag and Last-Modified, so browsers and
+CDNs revalidate with a 304. Anonymous pages are `public` with s-maxage for
+a CDN; member pages are `private, no-cache`.
+
+Config (env): PAGE_CACHE=memory|redis|off, PAGE_CACHE_TTL (seconds the
+server keeps a render), PAGE_CACHE_MAX_AGE (browser max-age for anonymous
+pages). APP_VERSION / RENDER_GIT_COMMIT / VERCEL_GIT_COMMIT_SHA and the
+asset manifest feed the catalog version, so a deploy never serves stale
+renders.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session
+from markupsafe import Markup
+from flask_login import current_user
+from sqlalchemy import event
+from models import Module
+from assets import manifest_version
+
+# Bumped on local Module changes (pricing); other workers catch up after PAGE_CACHE_TTL
+_module_generation = 0
+
+
+class MemoryPageCache:
+    """Bounded in-process LRU with per-entry expiry."""
+
+    def __init__(self, ttl, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisPageCache:
+    """Shares renders between workers and instances through Redis."""
+
+    def __init__(self, client, ttl, prefix='page:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            current_app.logger.warning("Page cache read failed: %s", e)
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, key, entry):
+        try:
+            self.client.setex(self.prefix + key, int(self.ttl), json.dumps(entry))
+        except Exception as e:
+            current_app.logger.warning("Page cache write failed: %s", e)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+# Rendered HTML fragments (e.g. lesson bodies). They are small and cheap to
+# rebuild, so they always live in process memory rather than Redis.
+_fragments = MemoryPageCache(ttl=float(os.getenv('FRAGMENT_CACHE_TTL', '86400')), max_entries=1024)
+
+
+def cached_fragment(key, render):
+    """Return the cached HTML for `key`, calling render() to build it on a miss.
+
+    Callers put a content version in the key, so stale fragments are never
+    served; the TTL only bounds memory for content that is no longer used.
+    """
+    html = _fragments.get(key)
+    if html is None:
+        html = Markup(render())
+        _fragments.set(key, html)
+    return html
+
+
+_versions = {}
+
+
+def catalog_version():
+    """Version stamp of everything a public page is rendered from."""
+    generation = _module_generation
+    if generation not in _versions:
+        from routes.courses import courses_data
+        build = (os.getenv('APP_VERSION') or os.getenv('RENDER_GIT_COMMIT')
+                 or os.getenv('VERCEL_GIT_COMMIT_SHA') or 'dev')
+        digest = hashlib.sha1(json.dumps(courses_data, sort_keys=True).encode('utf-8'))
+        digest.update(f'{build}:{generation}:{manifest_version()}'.encode('utf-8'))
+        _versions.clear()
+        _versions[generation] = digest.hexdigest()[:12]
+    return _versions[generation]
+
+
+@event.listens_for(Module, 'after_insert')
+@event.listens_for(Module, 'after_update')
+@event.listens_for(Module, 'after_delete')
+def _bump_module_generation(mapper, connection, target):
+    global _module_generation
+    _module_generation += 1
+
+
+def init_page_cache(app):
+    """Attach the configured page cache backend (or none) to the app."""
+    backend = (os.getenv('PAGE_CACHE') or ('redis' if app.config.get('SESSION_REDIS') else 'memory')).lower()
+    ttl = float(os.getenv('PAGE_CACHE_TTL', '300'))
+    app.config['PAGE_CACHE_MAX_AGE'] = int(os.getenv('PAGE_CACHE_MAX_AGE', '60'))
+    app.config['PAGE_CACHE_TTL'] = ttl
+
+    if backend == 'off':
+        return
+    if backend == 'redis' and app.config.get('SESSION_REDIS') is not None:
+        app.extensions['page_cache'] = RedisPageCache(app.config['SESSION_REDIS'], ttl)
+    else:
+        app.extensions['page_cache'] = MemoryPageCache(ttl)
+
+
+def _cache_control(response, audience):
+    if audience == 'anon':
+        max_age = current_app.config['PAGE_CACHE_MAX_AGE']
+        s_maxage = int(current_app.config['PAGE_CACHE_TTL'])
+        response.headers['Cache-Control'] = f'public, max-age={max_age}, s-maxage={s_maxage}'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+
+
+def cached_page(view):
+    """Serve a public page from the page cache, with ETag/Last-Modified revalidation."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('page_cache')
+        # Pending flash messages are rendered into the page: never cache those
+        if cache is None or request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        audience = 'member' if current_user.is_authenticated else 'anon'
+        key = f'{catalog_version()}:{audience}:{request.full_path}'
+        entry = cache.get(key)
+
+        if entry is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            body = response.get_data(as_text=True)
+            entry = {
+                'body': body,
+                'mimetype': response.mimetype,
+                'etag': hashlib.sha1(body.encode('utf-8')).hexdigest(),
+                'last_modified': int(time.time()),
+            }
+            cache.set(key, entry)
+
+        response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+        response.set_etag(entry['etag'])
+        response.last_modified = entry['last_modified']
+        _cache_control(response, audience)
+        return response.make_conditional(request)
+    return wrapper
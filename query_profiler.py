@@ -0,0 +1,123 @@
+"""
+Per-request SQL query counting, Server-Timing and query budgets.
+
+SQLAlchemy cursor events (on every engine, so replica reads count too) tally
+the number of statements and the time spent in the database for the current
+request. After each request:
+
+- a debug log line records endpoint, query count and DB time;
+- with SERVER_TIMING on (default in debug/testing) the response carries
+  `Server-Timing: db;dur=12.3;desc="7 queries"`, visible in the browser's
+  network panel;
+- the count is checked against the endpoint's budget (QUERY_BUDGET, or
+  @query_budget(n) on the view), and any single statement run
+  N_PLUS_ONE_THRESHOLD times or more is reported as a likely N+1.
+
+QUERY_BUDGET_MODE decides what a violation does: 'raise' (default under
+testing) turns it into a QueryBudgetExceeded error, 'warn' (default in debug
+and production) logs a warning, 'off' skips the checks.
+"""
+import os
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_QUERY_BUDGET = 30
+N_PLUS_ONE_THRESHOLD = 5
+_BUDGET_ATTR = '_query_budget'
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """An endpoint ran more queries than its budget allows (raised in 'raise' mode)."""
+
+
+def query_budget(limit):
+    """Set a per-view query budget, overriding QUERY_BUDGET for that endpoint."""
+    def decorator(view):
+        # Plain attribute: functools.wraps in outer decorators (login_required) carries it along
+        setattr(view, _BUDGET_ATTR, limit)
+        return view
+    return decorator
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_stats' in g:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is None or not has_request_context() or 'query_stats' not in g:
+        return
+    stats = g.query_stats
+    stats['count'] += 1
+    stats['seconds'] += time.perf_counter() - started
+    stats['statements'][statement] += 1
+
+
+def _endpoint_budget(app):
+    view = app.view_functions.get(request.endpoint)
+    budget = getattr(view, _BUDGET_ATTR, None)
+    # An explicit @query_budget(0) is a budget too
+    return app.config['QUERY_BUDGET'] if budget is None else budget
+
+
+def _budget_mode(app):
+    mode = app.config.get('QUERY_BUDGET_MODE')
+    if mode:
+        return mode
+    return 'raise' if app.testing else 'warn'
+
+
+def _check_budget(app, stats):
+    mode = _budget_mode(app)
+    if mode == 'off':
+        return
+
+    problems = []
+    budget = _endpoint_budget(app)
+    if stats['count'] > budget:
+        problems.append(f"{stats['count']} queries (budget {budget})")
+    repeated = [(statement, n) for statement, n in stats['statements'].most_common(3) if n >= N_PLUS_ONE_THRESHOLD]
+    for statement, n in repeated:
+        problems.append(f"likely N+1: ran {n}x: {' '.join(statement.split())[:160]}")
+    if not problems:
+        return
+
+    message = f"{request.method} {request.path} ({request.endpoint}): " + '; '.join(problems)
+    # Only the hard budget fails the request; N+1 hints are advisory
+    if mode == 'raise' and stats['count'] > budget:
+        raise QueryBudgetExceeded(message)
+    app.logger.warning("Query budget: %s", message)
+
+
+def init_query_profiler(app):
+    """Count queries per request and attach Server-Timing / budget checks."""
+    app.config['QUERY_BUDGET'] = int(os.getenv('QUERY_BUDGET', DEFAULT_QUERY_BUDGET))
+    app.config['QUERY_BUDGET_MODE'] = (os.getenv('QUERY_BUDGET_MODE') or '').lower() or None
+    server_timing = os.getenv('SERVER_TIMING')
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = {'count': 0, 'seconds': 0.0, 'statements': Counter()}
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        db_ms = stats['seconds'] * 1000
+        app.logger.debug("%s %s (%s): %d queries, %.1f ms in DB",
+                         request.method, request.path, request.endpoint, stats['count'], db_ms)
+
+        show_header = server_timing.lower() == 'true' if server_timing else (app.debug or app.testing)
+        if show_header:
+            response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{stats["count"]} queries"')
+
+        _check_budget(app, stats)
+        return response
@@ -0,0 +1,103 @@
+"""
+Parse-once cache of compiled quiz definitions.
+
+Module.quiz_questions is stored as a JSON string. Instead of json.loads-ing it
+(and fetching the whole Module row) on every view and submission, we compile
+it once per (module id, updated_at) into a CompiledQuiz holding the parsed
+questions, a precomputed answer key and a grading function.
+
+Within QUIZ_CACHE_TTL seconds a cached quiz is served without touching the
+database. After that it is revalidated with a narrow updated_at lookup, so
+edits made by other workers are picked up. Edits made in this process
+invalidate the entry immediately through SQLAlchemy events.
+"""
+import os
+import json
+import time
+import operator
+import threading
+from sqlalchemy import event
+from models import db, Module
+
+CACHE_TTL_SECONDS = float(os.getenv('QUIZ_CACHE_TTL', '60'))
+
+# Never equal to any submitted answer (questions without a correct_answer)
+_NO_ANSWER = object()
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class CompiledQuiz:
+    """Parsed quiz questions plus a precomputed answer key."""
+
+    __slots__ = ('module_id', 'version', 'questions', 'field_names', 'answer_key', 'total', 'checked_at')
+
+    def __init__(self, module_id, version, raw_questions):
+        self.module_id = module_id
+        self.version = version
+        self.questions = json.loads(raw_questions) if raw_questions else []
+        self.total = len(self.questions)
+        self.field_names = tuple(f'question_{i}' for i in range(self.total))
+        self.answer_key = tuple(q.get('correct_answer') or _NO_ANSWER for q in self.questions)
+        self.checked_at = time.monotonic()
+
+    def grade(self, form):
+        """Return the percentage score (0-100) for submitted form answers."""
+        if not self.total:
+            return 0
+        answers = [form.get(name) or None for name in self.field_names]
+        correct = sum(map(operator.eq, answers, self.answer_key))
+        return int((correct / self.total) * 100)
+
+
+def _compile(module_id, version, raw_questions):
+    quiz = CompiledQuiz(module_id, version, raw_questions)
+    with _lock:
+        _cache[module_id] = quiz
+    return quiz
+
+
+def get_quiz(module_id, module=None):
+    """Return the CompiledQuiz for a module, or None if the module doesn't exist.
+
+    Pass an already loaded ``module`` to validate against its updated_at without
+    any extra query.
+    """
+    quiz = _cache.get(module_id)
+
+    if module is not None:
+        if quiz is not None and quiz.version == module.updated_at:
+            quiz.checked_at = time.monotonic()
+            return quiz
+        return _compile(module_id, module.updated_at, module.quiz_questions)
+
+    if quiz is not None and time.monotonic() - quiz.checked_at < CACHE_TTL_SECONDS:
+        return quiz
+
+    # Revalidate with a narrow version lookup instead of loading the module row
+    row = db.session.query(Module.updated_at).filter(Module.id == module_id).first()
+    if row is None:
+        invalidate(module_id)
+        return None
+    if quiz is not None and quiz.version == row.updated_at:
+        quiz.checked_at = time.monotonic()
+        return quiz
+
+    raw_questions = db.session.query(Module.quiz_questions).filter(Module.id == module_id).scalar()
+    return _compile(module_id, row.updated_at, raw_questions)
+
+
+def invalidate(module_id=None):
+    """Drop one cached quiz, or all of them when module_id is None."""
+    with _lock:
+        if module_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(module_id, None)
+
+
+@event.listens_for(Module, 'after_update')
+@event.listens_for(Module, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    invalidate(target.id)
@@ -0,0 +1,404 @@
+"""
+Request timing, per-endpoint latency histograms and a Prometheus /metrics endpoint.
+
+RequestMetricsMiddleware wraps the WSGI app and, for every request, records
+how long the app took to produce its response, labelled by blueprint,
+endpoint (the Flask endpoint name, never the raw path) and method, plus a
+count per status code and an in-flight gauge. Streamed bodies (e.g. /media)
+are timed until the response starts, not until the last byte is sent.
+
+Each gunicorn worker keeps its own counters and a background thread
+publishes a snapshot to shared storage every METRICS_FLUSH_SECONDS (and on
+worker exit); /metrics merges the snapshots of
+all workers, so any worker can answer a scrape:
+
+    METRICS_STORE=redis   snapshots in a Redis hash (default when REDIS_URL is set)
+    METRICS_STORE=dir     one JSON file per worker in METRICS_DIR
+                          (gunicorn.conf.py sets this up when there is no Redis)
+    METRICS_STORE=local   this process only (development server)
+
+The DB pool counters from db_pool.py are folded into the same snapshots.
+/metrics and /metrics/db-pool require `Authorization: Bearer $METRICS_TOKEN`.
+Without METRICS_TOKEN they are open in development and always 403 with
+FLASK_ENV=production (METRICS_ALLOW_ANONYMOUS), so traffic, errors, pool
+state and LLM spend are never public by accident.
+"""
+import glob
+import hmac
+import json
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, current_app, request, abort
+from db_pool import pool_stats
+
+# Upper bounds in seconds; chatbot replies wait on OpenAI, hence the long tail
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+UNMATCHED_ENDPOINT = '<unmatched>'
+SEPARATOR = '|'
+# Flask drops environ['werkzeug.request'] when the request context ends, so a
+# teardown hook leaves the (blueprint, endpoint) labels here for the middleware
+LABELS_ENVIRON_KEY = 'innerwork.metrics_labels'
+
+# db_pool.PoolStats fields: summed across workers, except the ones that are maxima
+POOL_MAX_FIELDS = {'max_in_use', 'wait_seconds_max'}
+POOL_GAUGE_FIELDS = {'in_use', 'max_in_use', 'wait_seconds_max', 'wait_seconds_avg'}
+
+
+# name -> (type, help text, histogram buckets); exported with an innerwork_ prefix
+METRICS = {}
+
+
+def register_metric(name, kind, help_text, buckets=None):
+    """Declare a counter or histogram that WorkerMetrics.inc()/observe() can record."""
+    METRICS[name] = (kind, help_text, buckets)
+
+
+register_metric('http_request_duration_seconds', 'histogram',
+                'Time for the app to produce a response.', LATENCY_BUCKETS)
+register_metric('http_requests_total', 'counter', 'Requests by endpoint and status code.')
+
+
+def _series_key(name, labels):
+    return SEPARATOR.join([name] + [f'{label}={value}' for label, value in labels.items()])
+
+
+def _parse_series_key(key):
+    name, *pairs = key.split(SEPARATOR)
+    return name, dict(pair.split('=', 1) for pair in pairs)
+
+
+class WorkerMetrics:
+    """Cumulative counters and histograms for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.in_flight = 0
+
+    def inc(self, name, amount=1, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = _series_key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # One slot per bucket plus +Inf; counts are per bucket, made cumulative on export
+                histogram = self.histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+            histogram['buckets'][bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, blueprint, endpoint, method, status, seconds):
+        with self._lock:
+            self.in_flight -= 1
+        self.inc('http_requests_total', blueprint=blueprint, endpoint=endpoint, method=method, status=status)
+        self.observe('http_request_duration_seconds', seconds, blueprint=blueprint, endpoint=endpoint, method=method)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'updated': time.time(),
+                'in_flight': self.in_flight,
+                'counters': dict(self.counters),
+                'histograms': {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                               for key, h in self.histograms.items()},
+                'db_pool': pool_stats.snapshot(),
+            }
+
+
+worker_metrics = WorkerMetrics()
+
+
+class LocalMetricsStore:
+    """Single-process store: the only snapshot is our own."""
+
+    def publish(self, snapshot):
+        pass
+
+    def collect(self, own_snapshot):
+        return [own_snapshot]
+
+    def clear(self):
+        pass
+
+
+class DirMetricsStore:
+    """One JSON snapshot file per worker in a directory shared by the workers."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'worker-{pid}.json')
+
+    def publish(self, snapshot):
+        path = self._path(snapshot['pid'])
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def collect(self, own_snapshot):
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, 'worker-*.json')):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot['pid'] == own_snapshot['pid']:
+                continue
+            # Counters of exited workers still count; their in-flight gauge doesn't
+            snapshot['alive'] = _pid_alive(snapshot['pid'])
+            snapshots.append(snapshot)
+        return snapshots + [own_snapshot]
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, 'worker-*.json*')):
+            os.remove(path)
+
+
+class RedisMetricsStore:
+    """Worker snapshots in one Redis hash, shared across workers and instances."""
+
+    def __init__(self, client, ttl, key='metrics:workers'):
+        self.client = client
+        self.ttl = ttl
+        self.key = key
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+    def publish(self, snapshot):
+        self.worker_id = f"{socket.gethostname()}:{snapshot['pid']}"
+        pipe = self.client.pipeline()
+        pipe.hset(self.key, self.worker_id, json.dumps(snapshot))
+        pipe.setex(f'{self.key}:alive:{self.worker_id}', int(self.ttl), 1)
+        pipe.execute()
+
+    def collect(self, own_snapshot):
+        raw = self.client.hgetall(self.key)
+        others = {k.decode(): v for k, v in raw.items() if k.decode() != self.worker_id}
+        alive_keys = [f'{self.key}:alive:{worker_id}' for worker_id in others]
+        alive = self.client.mget(alive_keys) if alive_keys else []
+        snapshots = []
+        for (worker_id, value), is_alive in zip(others.items(), alive):
+            snapshot = json.loads(value)
+            snapshot['alive'] = is_alive is not None
+            snapshots.append(snapshot)
+        return snapshots + [own_snapshot]
+
+    def clear(self):
+        self.client.delete(self.key)
+        for key in self.client.scan_iter(f'{self.key}:alive:*'):
+            self.client.delete(key)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by someone else
+    return True
+
+
+def create_store(kind=None, redis_client=None, directory=None, flush_seconds=5.0):
+    """Build the configured metrics store (see module docstring for the defaults)."""
+    kind = (kind or ('redis' if redis_client is not None else 'dir' if directory else 'local')).lower()
+    if kind == 'redis':
+        if redis_client is None:
+            raise ValueError("METRICS_STORE=redis needs REDIS_URL")
+        return RedisMetricsStore(redis_client, ttl=max(30, flush_seconds * 3))
+    if kind == 'dir':
+        if not directory:
+            raise ValueError("METRICS_STORE=dir needs METRICS_DIR")
+        return DirMetricsStore(directory)
+    if kind == 'local':
+        return LocalMetricsStore()
+    raise ValueError(f"METRICS_STORE must be one of redis, dir, local, got {kind!r}")
+
+
+class RequestMetricsMiddleware:
+    """WSGI middleware timing every request through the Flask app."""
+
+    def __init__(self, wsgi_app, store, flush_seconds=5.0, logger=None):
+        self.wsgi_app = wsgi_app
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.logger = logger
+        self._publisher_pid = None
+
+    def __call__(self, environ, start_response):
+        statuses = []
+
+        def recording_start_response(status, headers, exc_info=None):
+            statuses.append(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        self._ensure_publisher()
+        worker_metrics.started()
+        start = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, recording_start_response)
+        except Exception:
+            statuses.append('500')
+            raise
+        finally:
+            blueprint, endpoint = environ.get(LABELS_ENVIRON_KEY, ('', UNMATCHED_ENDPOINT))
+            worker_metrics.finished(blueprint, endpoint, environ.get('REQUEST_METHOD', ''),
+                                    statuses[-1] if statuses else '500', time.perf_counter() - start)
+
+    def _ensure_publisher(self):
+        # Started lazily so each forked worker gets its own thread (threads don't survive fork)
+        if self._publisher_pid == os.getpid():
+            return
+        self._publisher_pid = os.getpid()
+        threading.Thread(target=self._publish_forever, name='metrics-publisher', daemon=True).start()
+
+    def _publish_forever(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """Publish this worker's snapshot to the shared store (errors are only logged)."""
+        try:
+            self.store.publish(worker_metrics.snapshot())
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.warning("Publishing request metrics failed: %s", e)
+
+
+def merge_snapshots(snapshots):
+    """Combine worker snapshots into cluster-wide totals."""
+    merged = {'counters': {}, 'histograms': {}, 'in_flight': 0, 'db_pool': {}, 'workers': 0}
+    for snapshot in snapshots:
+        alive = snapshot.get('alive', True)
+        merged['workers'] += 1 if alive else 0
+        if alive:
+            merged['in_flight'] += snapshot['in_flight']
+
+        for key, value in snapshot.get('counters', {}).items():
+            merged['counters'][key] = merged['counters'].get(key, 0) + value
+
+        for key, histogram in snapshot.get('histograms', {}).items():
+            total = merged['histograms'].get(key)
+            if total is None:
+                total = merged['histograms'][key] = {'buckets': [0] * len(histogram['buckets']), 'sum': 0.0, 'count': 0}
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], histogram['buckets'])]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+
+        for field, value in snapshot.get('db_pool', {}).items():
+            if field == 'wait_seconds_avg' or (field == 'in_use' and not alive):
+                continue
+            if field in POOL_MAX_FIELDS:
+                merged['db_pool'][field] = max(merged['db_pool'].get(field, 0), value)
+            else:
+                merged['db_pool'][field] = merged['db_pool'].get(field, 0) + value
+    return merged
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus(merged):
+    """Prometheus text exposition format (version 0.0.4)."""
+    by_name = {}
+    for kind in ('counters', 'histograms'):
+        for key in merged[kind]:
+            name, labels = _parse_series_key(key)
+            by_name.setdefault(name, []).append((labels, merged[kind][key]))
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted(by_name.get(name, []), key=lambda item: sorted(item[0].items()))
+        if not series:
+            continue
+        metric = f'innerwork_{name}'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        for labels, value in series:
+            if kind != 'histogram':
+                lines.append(f'{metric}{_labels(**labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value['buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{_labels(**labels, le=bound)} {cumulative}')
+            lines.append(f"{metric}_sum{_labels(**labels)} {value['sum']:.6f}")
+            lines.append(f"{metric}_count{_labels(**labels)} {value['count']}")
+
+    lines += [
+        '# HELP innerwork_http_requests_in_flight Requests currently being handled.',
+        '# TYPE innerwork_http_requests_in_flight gauge',
+        f"innerwork_http_requests_in_flight {merged['in_flight']}",
+        '# HELP innerwork_workers Workers that published metrics recently.',
+        '# TYPE innerwork_workers gauge',
+        f"innerwork_workers {merged['workers']}",
+    ]
+
+    for field in sorted(merged['db_pool']):
+        is_gauge = field in POOL_GAUGE_FIELDS
+        name = f'innerwork_db_pool_{field}'
+        if not is_gauge and not name.endswith('_total'):
+            name += '_total'
+        lines.append(f"# TYPE {name} {'gauge' if is_gauge else 'counter'}")
+        lines.append(f"{name} {merged['db_pool'][field]}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def require_metrics_token():
+    """403 unless the request carries the METRICS_TOKEN bearer token.
+
+    With no token configured, only apps with METRICS_ALLOW_ANONYMOUS (not
+    production) serve metrics to anyone.
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        if not current_app.config.get('METRICS_ALLOW_ANONYMOUS'):
+            abort(403)
+        return
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(403)
+
+
+def init_request_metrics(app):
+    """Wrap the app in the timing middleware and register /metrics."""
+    flush_seconds = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+    store = create_store(os.getenv('METRICS_STORE'), app.config.get('SESSION_REDIS'),
+                         os.getenv('METRICS_DIR'), flush_seconds)
+    middleware = RequestMetricsMiddleware(app.wsgi_app, store, flush_seconds, app.logger)
+    app.wsgi_app = middleware
+    app.extensions['request_metrics'] = middleware
+    if not app.config.get('METRICS_TOKEN') and not app.config.get('METRICS_ALLOW_ANONYMOUS'):
+        app.logger.warning("METRICS_TOKEN is not set: /metrics and /metrics/db-pool will answer 403")
+
+    @app.teardown_request
+    def remember_metrics_labels(exc):
+        request.environ[LABELS_ENVIRON_KEY] = (request.blueprint or '', request.endpoint or UNMATCHED_ENDPOINT)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        require_metrics_token()
+        # Publish first so this worker's latest numbers are in the merge
+        middleware.flush()
+        merged = merge_snapshots(store.collect(worker_metrics.snapshot()))
+        return Response(render_prometheus(merged), mimetype='text/plain; version=0.0.4')
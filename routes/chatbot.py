@@ -1,14 +1,31 @@
 import os
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, render_template, request, jsonify, session, current_app
 from flask_login import login_required, current_user
 from models import db, ChatHistory
+from llm_telemetry import llm_call
+from chat_archive import history_page, encode_cursor, parse_cursor, HISTORY_PAGE_SIZE
+from chat_search import search_turns, SearchUnavailable, SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX, MAX_QUERY_LENGTH
 from datetime import datetime
-from openai import OpenAI
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+HISTORY_PAGE_MAX = 200
+
+# OpenAI client, created on first use so the SDK import stays off cold start
+client = None
+
+def get_client():
+    """Return the OpenAI client, importing the SDK and creating it on first call"""
+    global client
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return client
+
+def reset_client():
+    """Drop the OpenAI client (its HTTP pool must not be shared across forked workers)"""
+    global client
+    client = None
 
 # System prompt defining Debbie Green's therapeutic persona
 SYSTEM_PROMPT = """You are Debbie Green, MA, PSC — a compassionate psychotherapist and life coach with Journeys Edgez Life Coaching.
@@ -49,7 +66,8 @@ def save_conversation_turn(user_message, assistant_message):
     session.modified = True
 
 def get_openai_response(user_message):
-    """Get response from OpenAI with conversation context"""
+    """Get response from OpenAI with conversation context (telemetry in llm_telemetry.py)"""
+    model = os.getenv('MODEL_NAME', 'gpt-4o-mini')
     try:
         # Build messages for API
         messages = [{"role": "system", "content": SYSTEM_PROMPT}]
@@ -61,18 +79,35 @@ def get_openai_response(user_message):
         # Add current user message
         messages.append({"role": "user", "content": user_message})
         
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model=os.getenv('MODEL_NAME', 'gpt-4o-mini'),
-            messages=messages,
-            temperature=0.7,
-            max_tokens=300
-        )
+        with llm_call(model, context_messages=len(conversation)) as call:
+            # Streamed so time-to-first-token can be measured; usage arrives in the last chunk
+            stream = get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=300,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            parts = []
+            usage = None
+            finish_reason = None
+            for chunk in stream:
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    if choice.delta and choice.delta.content:
+                        call.first_token()
+                        parts.append(choice.delta.content)
+                    finish_reason = choice.finish_reason or finish_reason
+                if chunk.usage is not None:
+                    usage = chunk.usage
+            call.finish(usage, finish_reason)
         
-        return response.choices[0].message.content
+        return ''.join(parts)
     
     except Exception as e:
-        print(f"OpenAI API Error: {e}")
+        current_app.logger.warning("OpenAI API error (%s): %s", model, e)
         return "I'm having trouble connecting right now. Please try again in a moment. If this persists, please reach out for support."
 
 @chatbot_bp.route('/chatbot')
@@ -124,15 +159,63 @@ def clear_conversation():
 @chatbot_bp.route('/chatbot/history')
 @login_required
 def get_chat_history():
-    chat_history = ChatHistory.query.filter_by(user_id=current_user.id).order_by(ChatHistory.timestamp.asc()).all()
+    """Newest page of chat turns; pass ?before=<next_before> for older ones (archived turns included)"""
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_PAGE_MAX))
+    before = request.args.get('before')
+    if before:
+        try:
+            before = parse_cursor(before)
+        except ValueError:
+            return jsonify({"error": "before must be a next_before cursor or an ISO timestamp"}), 400
+    
+    turns, next_before = history_page(current_user.id, before or None, limit)
     
     history_data = [
         {
-            "message": chat.message,
-            "response": chat.response,
-            "timestamp": chat.timestamp.isoformat()
+            "message": turn['message'],
+            "response": turn['response'],
+            "timestamp": turn['timestamp'].isoformat(),
+            "archived": turn['archived']
         }
-        for chat in chat_history
+        for turn in turns
     ]
     
-    return jsonify({"history": history_data})
+    return jsonify({
+        "history": history_data,
+        "next_before": encode_cursor(next_before) if next_before else None
+    })
+
+@chatbot_bp.route('/chatbot/search')
+@login_required
+def search_chat_history():
+    """Ranked full-text search over the user's chat turns: ?q=...&page=1&per_page=20"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    if len(query) > MAX_QUERY_LENGTH:
+        return jsonify({"error": f"q must be at most {MAX_QUERY_LENGTH} characters"}), 400
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = max(1, min(request.args.get('per_page', SEARCH_PAGE_SIZE, type=int), SEARCH_PAGE_MAX))
+    
+    try:
+        turns, has_more = search_turns(current_user.id, query, page, per_page)
+    except SearchUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    
+    results = [
+        {
+            "id": turn['id'],
+            "message": turn['message'],
+            "response": turn['response'],
+            "timestamp": turn['timestamp'].isoformat(),
+            "rank": round(turn['rank'], 4)
+        }
+        for turn in turns
+    ]
+    
+    return jsonify({
+        "results": results,
+        "page": page,
+        "per_page": per_page,
+        "has_more": has_more
+    })
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify
 from flask_login import login_required, current_user
-from models import Purchase, Enrollment
+from models import UserCourseSummary
+from page_cache import cached_page
+from query_profiler import query_budget
 
 courses_bp = Blueprint('courses', __name__, url_prefix='/courses')
 
@@ -73,22 +75,17 @@ courses_data = [
 ]
 
 @courses_bp.route('/')
+@query_budget(2)
+@cached_page
 def list_courses():
     """Display all available courses in the library"""
-    # Check which courses user has purchased (if authenticated)
-    purchased_ids = []
-    if current_user.is_authenticated:
-        purchases = Purchase.query.filter_by(
-            user_id=current_user.id,
-            payment_status='completed'
-        ).all()
-        purchased_ids = [p.module_id for p in purchases]
-    
+    # Purchased badges are filled in client-side from /courses/access,
+    # so this page renders the same for every visitor and stays cacheable
     return render_template('courses/index.html', 
-                         courses=courses_data,
-                         purchased_ids=purchased_ids)
+                         courses=courses_data)
 
 @courses_bp.route('/<int:course_id>')
+@cached_page
 def course_detail(course_id):
     """Display detailed information about a specific course"""
     course = next((c for c in courses_data if c["id"] == course_id), None)
@@ -96,22 +93,22 @@ def course_detail(course_id):
     if not course:
         return render_template('404.html'), 404
     
-    # Check if user has purchased this course (check both Purchase and Enrollment tables)
-    is_purchased = False
+    # Enrollment state comes from /courses/access (see static/js/course_access.js)
+    return render_template('courses/detail.html', 
+                         course=course)
+
+@courses_bp.route('/access')
+def course_access():
+    """Personalized fragment for cached course pages: which courses the user can open"""
+    purchased_ids = []
     if current_user.is_authenticated:
-        # Check old Purchase table
-        purchase = Purchase.query.filter_by(
-            user_id=current_user.id,
-            module_id=course_id,
-            payment_status='completed'
-        ).first()
-        # Check new Enrollment table
-        enrollment = Enrollment.query.filter_by(
-            user_id=current_user.id,
-            module_id=course_id
-        ).first()
-        is_purchased = bool(purchase or enrollment)
+        # Purchase or Enrollment, via summary
+        summaries = UserCourseSummary.for_user(current_user.id)
+        purchased_ids = [s.module_id for s in summaries if s.has_access]
     
-    return render_template('courses/detail.html', 
-                         course=course,
-                         is_purchased=is_purchased)
+    response = jsonify({
+        'authenticated': current_user.is_authenticated,
+        'purchased_ids': purchased_ids
+    })
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
-from models import db, Enrollment, Module
+from models import db, Enrollment, Module, UserCourseSummary
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
@@ -8,10 +8,9 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 @login_required
 def dashboard_home():
     """Show user's enrolled modules with progress."""
-    enrollments = (db.session.query(Enrollment, Module)
-                   .join(Module, Enrollment.module_id == Module.id)
-                   .filter(Enrollment.user_id == current_user.id)
-                   .all())
+    summaries = [s for s in UserCourseSummary.for_user(current_user.id) if s.enrolled]
+    modules = {m.id: m for m in Module.query.filter(Module.id.in_([s.module_id for s in summaries]))} if summaries else {}
+    enrollments = [(s, modules[s.module_id]) for s in summaries if s.module_id in modules]
     return render_template('dashboard/index.html', progress=enrollments)
 
 @dashboard_bp.route('/progress/<int:module_id>/<int:new_percent>', methods=['POST'])
@@ -27,9 +26,77 @@ def update_progress(module_id, new_percent):
     if enrollment.progress >= 100:
         enrollment.status = 'complete'
     
+    summary = UserCourseSummary.upsert(current_user.id, module_id)
+    summary.enrolled = True
+    summary.progress = enrollment.progress
+    summary.status = enrollment.status
+    
     db.session.commit()
     return jsonify({
         'ok': True, 
         'progress': enrollment.progress, 
         'status': enrollment.status
     })
+
+@dashboard_bp.route('/progress/batch', methods=['POST'])
+@login_required
+def update_progress_batch():
+    """Apply many client-side progress events in a single transaction.
+    
+    Expects JSON ``{"events": [{"module_id": 1, "percent": 40}, ...]}``. Events
+    are coalesced per module so the highest percent wins, and progress never
+    moves backwards (scrolling back up a lesson shouldn't undo it).
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list):
+        return jsonify({'error': 'events must be a list'}), 400
+    
+    # Coalesce per module: max wins
+    best = {}
+    for event in events:
+        try:
+            module_id = int(event['module_id'])
+            percent = max(0, min(100, int(event['percent'])))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            # OverflowError: Infinity / 1e999 are valid JSON numbers but not ints
+            continue
+        best[module_id] = max(percent, best.get(module_id, 0))
+    
+    if not best:
+        return jsonify({'ok': True, 'updated': {}, 'skipped': []})
+    
+    enrollments = Enrollment.query.filter(
+        Enrollment.user_id == current_user.id,
+        Enrollment.module_id.in_(best.keys())
+    ).all()
+    summaries = {
+        s.module_id: s
+        for s in UserCourseSummary.query.filter(
+            UserCourseSummary.user_id == current_user.id,
+            UserCourseSummary.module_id.in_(best.keys())
+        ).all()
+    }
+    
+    updated = {}
+    for enrollment in enrollments:
+        enrollment.progress = max(enrollment.progress or 0, best[enrollment.module_id])
+        if enrollment.progress >= 100:
+            enrollment.status = 'complete'
+        
+        summary = summaries.get(enrollment.module_id) or UserCourseSummary.upsert(current_user.id, enrollment.module_id)
+        summary.enrolled = True
+        summary.progress = enrollment.progress
+        summary.status = enrollment.status
+        
+        updated[str(enrollment.module_id)] = {
+            'progress': enrollment.progress,
+            'status': enrollment.status
+        }
+    
+    db.session.commit()
+    return jsonify({
+        'ok': True,
+        'updated': updated,
+        'skipped': [module_id for module_id in best if str(module_id) not in updated]
+    })
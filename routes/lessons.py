@@ -1,6 +1,10 @@
+import hashlib
+from functools import lru_cache
 from flask import Blueprint, render_template, redirect, url_for
 from flask_login import login_required, current_user
-from models import Purchase, Enrollment
+from models import UserCourseSummary
+from page_cache import cached_fragment
+from query_profiler import query_budget
 
 lessons_bp = Blueprint("lessons", __name__, url_prefix="/lessons")
 
@@ -332,23 +336,25 @@ May you walk forward with tender resilience."""
     ],
 }
 
+@lru_cache(maxsize=256)
+def content_version(content):
+    """Short hash of lesson content, so edited lessons get a fresh fragment"""
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+
+def render_lesson_body(course_id, lesson):
+    """Render the static lesson body once per (course, lesson, content version)"""
+    key = f"lesson:{course_id}:{lesson['id']}:{content_version(lesson['content'])}"
+    return cached_fragment(key, lambda: render_template("includes/lesson_body.html", lesson=lesson))
+
 @lessons_bp.route("/<int:course_id>/<int:lesson_id>")
+@query_budget(4)
 @login_required
 def show_lesson(course_id, lesson_id):
     """Display a specific lesson for a course"""
-    # Check if user has purchased this course (check both Purchase and Enrollment tables)
-    purchase = Purchase.query.filter_by(
-        user_id=current_user.id,
-        module_id=course_id,
-        payment_status='completed'
-    ).first()
-    
-    enrollment = Enrollment.query.filter_by(
-        user_id=current_user.id,
-        module_id=course_id
-    ).first()
+    # Check if user has purchased this course (Purchase or Enrollment, via summary)
+    summaries = UserCourseSummary.for_user(current_user.id, course_id)
     
-    if not purchase and not enrollment:
+    if not any(summary.has_access for summary in summaries):
         return redirect(url_for('courses.course_detail', course_id=course_id))
     
     # Get lessons for this course
@@ -368,6 +374,7 @@ def show_lesson(course_id, lesson_id):
         "lessons/lesson.html",
         course_id=course_id,
         lesson=lesson,
+        lesson_body=render_lesson_body(course_id, lesson),
         next_id=next_id,
         prev_id=prev_id,
         total_lessons=total_lessons,
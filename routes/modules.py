@@ -1,36 +1,23 @@
-import json
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, abort
 from flask_login import login_required, current_user
-from models import db, Module, Progress, Purchase, Enrollment
+from models import db, Module, Progress, Purchase, UserCourseSummary
+from quiz_cache import get_quiz
+from query_profiler import query_budget
 from datetime import datetime
 from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 
 modules_bp = Blueprint('modules', __name__)
 
 @modules_bp.route('/dashboard')
+@query_budget(5)
 @login_required
 def dashboard():
     # Import hardcoded course data
     from routes.courses import courses_data
     
-    # Get user's progress (old system)
-    user_progress = Progress.query.filter_by(user_id=current_user.id).all()
-    
-    # Get purchased modules from old Purchase table
-    purchases = Purchase.query.filter_by(
-        user_id=current_user.id, 
-        payment_status='completed'
-    ).all()
-    purchased_module_ids = [p.module_id for p in purchases]
-    
-    # Get enrolled modules from new Enrollment table (Stripe purchases)
-    enrollments = Enrollment.query.filter_by(user_id=current_user.id).all()
-    enrolled_module_ids = [e.module_id for e in enrollments]
-    
-    # Combine both sources
-    all_module_ids = list(set(purchased_module_ids + enrolled_module_ids))
+    # One summary row per course replaces merging Progress, Purchase and Enrollment
+    summaries = UserCourseSummary.for_user(current_user.id)
+    all_module_ids = [s.module_id for s in summaries if s.has_access]
     
     # Get modules from database if they exist, otherwise use hardcoded data
     db_modules = Module.query.filter(Module.id.in_(all_module_ids)).all() if all_module_ids else []
@@ -52,19 +39,8 @@ def dashboard():
                         self.description = course_dict['description']
                 available_modules.append(CourseModule(course))
     
-    # Create progress map (prefer new Enrollment progress over old Progress)
-    progress_map = {p.module_id: p for p in user_progress}
-    
-    # Add enrollment progress data (convert to match old Progress format for template compatibility)
-    for enrollment in enrollments:
-        if enrollment.module_id not in progress_map:
-            # Create a pseudo-Progress object for template compatibility
-            class EnrollmentProgress:
-                def __init__(self, enrollment):
-                    self.module_id = enrollment.module_id
-                    self.score = enrollment.progress
-                    self.completed_date = enrollment.created_at
-            progress_map[enrollment.module_id] = EnrollmentProgress(enrollment)
+    # Summary rows expose score/completed_date, matching the template's Progress usage
+    progress_map = {s.module_id: s for s in summaries if s.has_progress}
     
     return render_template('dashboard.html', 
                          modules=available_modules, 
@@ -102,8 +78,8 @@ def view_module(module_id):
         flash('You need to purchase this module first.', 'warning')
         return redirect(url_for('payments.checkout', module_id=module_id))
     
-    # Parse quiz questions
-    quiz_questions = json.loads(module.quiz_questions) if module.quiz_questions else []
+    # Parsed once per module version (see quiz_cache)
+    quiz_questions = get_quiz(module_id, module=module).questions
     
     # Check if user has completed this module
     progress = Progress.query.filter_by(
@@ -119,25 +95,17 @@ def view_module(module_id):
 @modules_bp.route('/module/<int:module_id>/submit-quiz', methods=['POST'])
 @login_required
 def submit_quiz(module_id):
-    module = Module.query.get_or_404(module_id)
+    # Compiled quiz is cached, so repeat submissions skip the module fetch and JSON parsing
+    quiz = get_quiz(module_id)
+    if quiz is None:
+        abort(404)
     
-    # Get quiz answers from form
-    quiz_questions = json.loads(module.quiz_questions) if module.quiz_questions else []
-    
-    if not quiz_questions:
+    if not quiz.questions:
         flash('No quiz available for this module.', 'warning')
         return redirect(url_for('modules.view_module', module_id=module_id))
     
     # Calculate score
-    correct_answers = 0
-    total_questions = len(quiz_questions)
-    
-    for i, question in enumerate(quiz_questions):
-        user_answer = request.form.get(f'question_{i}')
-        if user_answer and user_answer == question.get('correct_answer'):
-            correct_answers += 1
-    
-    score = int((correct_answers / total_questions) * 100) if total_questions > 0 else 0
+    score = quiz.grade(request.form)
     
     # Save or update progress
     progress = Progress.query.filter_by(
@@ -156,6 +124,10 @@ def submit_quiz(module_id):
         )
         db.session.add(progress)
     
+    summary = UserCourseSummary.upsert(current_user.id, module_id)
+    summary.quiz_score = score
+    summary.quiz_completed_at = progress.completed_date or datetime.utcnow()
+    
     db.session.commit()
     
     flash(f'Quiz submitted! Your score: {score}%', 'success')
@@ -174,7 +146,10 @@ def download_certificate(module_id):
         flash('You need to complete this module first.', 'warning')
         return redirect(url_for('modules.view_module', module_id=module_id))
     
-    # Generate PDF certificate
+    # Generate PDF certificate (ReportLab is imported here to keep it off cold start)
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
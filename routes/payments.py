@@ -1,15 +1,12 @@
 import os
-import stripe
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from models import db, Module, Purchase
+from models import db, Module, Purchase, UserCourseSummary
 from datetime import datetime
+from page_cache import cached_page
 
 payments_bp = Blueprint('payments', __name__)
 
-# Configure Stripe
-stripe.api_key = os.getenv('STRIPE_API_KEY')
-
 @payments_bp.route('/checkout/<int:module_id>')
 @login_required
 def checkout(module_id):
@@ -50,6 +47,12 @@ def create_checkout_session(module_id):
             stripe_payment_id='test_payment_' + str(datetime.utcnow().timestamp())
         )
         db.session.add(purchase)
+        
+        summary = UserCourseSummary.upsert(current_user.id, module_id)
+        summary.purchased = True
+        if summary.enrolled_at is None:
+            summary.enrolled_at = datetime.utcnow()
+        
         db.session.commit()
         
         flash('Purchase successful! (Test mode)', 'success')
@@ -76,6 +79,7 @@ def stripe_webhook():
     return jsonify({'status': 'success'}), 200
 
 @payments_bp.route('/pricing')
+@cached_page
 def pricing():
     """Display pricing information for all modules"""
     modules = Module.query.all()
@@ -1,19 +1,26 @@
 import os
-import stripe
 from flask import Blueprint, request, jsonify, url_for, redirect, flash, current_app
 from flask_login import login_required, current_user
-from flask_mail import Mail, Message
-from models import db, Module, Enrollment
+from models import db, Module, Enrollment, UserCourseSummary
+from datetime import datetime
 
 stripe_bp = Blueprint('stripe', __name__, url_prefix='/stripe')
 
 # Test mode flag - set to True to bypass Stripe
 TEST_MODE = True
 
+def get_stripe():
+    """Import and configure the Stripe SDK on first use (keeps it off cold start)."""
+    import stripe
+    if stripe.api_key is None:
+        stripe.api_key = current_app.config.get('STRIPE_SECRET_KEY')
+    return stripe
+
 def send_email_safe(to, subject, html):
     """Send email with console fallback if SMTP not configured."""
     try:
-        mail = Mail(current_app)
+        from flask_mail import Mail, Message
+        mail = current_app.extensions.get('mail') or Mail(current_app)
         if not current_app.config.get('MAIL_SERVER') or not current_app.config.get('MAIL_USERNAME'):
             print("\n--- EMAIL (console fallback) ---")
             print("To:", to)
@@ -29,6 +36,15 @@ def send_email_safe(to, subject, html):
         print("Email send failed:", e)
         return False
 
+def mark_enrolled(user_id, module_id):
+    """Reflect a new enrollment in the user's course summary (caller commits)."""
+    summary = UserCourseSummary.upsert(user_id, module_id)
+    summary.enrolled = True
+    summary.progress = 0
+    summary.status = 'in_progress'
+    summary.enrolled_at = datetime.utcnow()
+    return summary
+
 @stripe_bp.route('/purchase/<int:module_id>', methods=['POST'])
 @login_required
 def purchase_module(module_id):
@@ -55,6 +71,7 @@ def purchase_module(module_id):
                 status='in_progress'
             )
             db.session.add(enrollment)
+            mark_enrolled(current_user.id, module_id)
             db.session.commit()
         
         # Send test email
@@ -84,7 +101,7 @@ def purchase_module(module_id):
         })
     
     try:
-        checkout_session = stripe.checkout.Session.create(
+        checkout_session = get_stripe().checkout.Session.create(
             mode='payment',
             line_items=[{
                 'price_data': {
@@ -119,7 +136,7 @@ def purchase_success(module_id):
     # Verify session with Stripe (optional but recommended)
     if session_id:
         try:
-            session = stripe.checkout.Session.retrieve(session_id)
+            session = get_stripe().checkout.Session.retrieve(session_id)
             if session.payment_status != 'paid':
                 flash('Payment not completed. Please try again.', 'warning')
                 return redirect(url_for('courses.course_detail', course_id=module_id))
@@ -140,6 +157,7 @@ def purchase_success(module_id):
             status='in_progress'
         )
         db.session.add(enrollment)
+        mark_enrolled(current_user.id, module_id)
         db.session.commit()
     
     # Send confirmation email
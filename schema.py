@@ -0,0 +1,150 @@
+"""
+Explicit schema management, kept off the request-serving startup path.
+
+`flask --app wsgi init-db` creates missing tables, applies pending migrations
+(migrations.py) and stamps SCHEMA_VERSION. `flask --app wsgi migrate` applies
+just the migrations, with knobs for batch size and throttling on big tables.
+At startup create_app() only does what SCHEMA_CHECK asks for:
+
+    create  - init-db, i.e. create tables and migrate (development default)
+    check   - one cached `SELECT version FROM schema_version` (production default)
+    skip    - no database access at all during startup
+"""
+import click
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+from models import db
+
+# Version of the last migration in migrations.py; bump together with it
+SCHEMA_VERSION = 9
+
+SCHEMA_CHECK_MODES = ('create', 'check', 'skip')
+
+# Result of the version check per database URL, so repeated create_app() calls
+# in one process (scripts, preloading master) only query once
+_checked_versions = {}
+
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+
+
+def stored_version():
+    """Version recorded in schema_version, or None for a new or pre-versioning database."""
+    if not inspect(db.engine).has_table(SchemaVersion.__tablename__):
+        return None
+    return db.session.query(SchemaVersion.version).scalar()
+
+
+def stamp_version(version):
+    row = SchemaVersion.query.first()
+    if row is None:
+        db.session.add(SchemaVersion(version=version))
+    else:
+        row.version = version
+    db.session.commit()
+    _checked_versions[current_app.config['SQLALCHEMY_DATABASE_URI']] = version
+
+
+def run_migrations(target=None, batch_size=None, throttle=None, echo=None):
+    """Apply pending migrations in order, stamping the version after each. Returns the version reached."""
+    from migrations import (MIGRATIONS, MigrationContext, pending_migrations,
+                            DEFAULT_BATCH_SIZE, DEFAULT_THROTTLE_SECONDS)
+    if MIGRATIONS[-1].version != SCHEMA_VERSION:
+        raise RuntimeError(f"SCHEMA_VERSION is {SCHEMA_VERSION} but the last migration is {MIGRATIONS[-1].version}")
+    
+    echo = echo or current_app.logger.info
+    ctx = MigrationContext(
+        db.engine,
+        batch_size=batch_size or DEFAULT_BATCH_SIZE,
+        throttle=DEFAULT_THROTTLE_SECONDS if throttle is None else throttle,
+        echo=echo
+    )
+    version = stored_version()
+    SchemaVersion.__table__.create(db.engine, checkfirst=True)
+    for step in pending_migrations(version, target):
+        echo(f"Migration {step.version}: {step.description}")
+        # Release the session's connection: DDL on SQLite (and CONCURRENTLY) needs it idle
+        db.session.remove()
+        step.apply(ctx)
+        stamp_version(step.version)
+        version = step.version
+    return version
+
+
+def init_schema(echo=None):
+    """Create missing tables, apply pending migrations and stamp the version. Returns the version."""
+    fresh = not inspect(db.engine).has_table('users')
+    db.create_all()
+    if fresh:
+        # create_all() already built the latest schema
+        stamp_version(SCHEMA_VERSION)
+        return SCHEMA_VERSION
+    return run_migrations(echo=echo)
+
+
+def check_schema(app):
+    """Return the stored schema version (None if unknown), warning when behind."""
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    if url in _checked_versions:
+        return _checked_versions[url]
+
+    try:
+        version = db.session.query(SchemaVersion.version).scalar()
+    except SQLAlchemyError:
+        db.session.rollback()
+        version = None
+
+    _checked_versions[url] = version
+    if version is None or version < SCHEMA_VERSION:
+        app.logger.warning(
+            "Database schema version is %s, code expects %s. Run `flask --app wsgi init-db`.",
+            version, SCHEMA_VERSION
+        )
+    return version
+
+
+def prepare_schema(app, mode):
+    """Run the startup schema step selected by SCHEMA_CHECK."""
+    if mode not in SCHEMA_CHECK_MODES:
+        raise ValueError(f"SCHEMA_CHECK must be one of {', '.join(SCHEMA_CHECK_MODES)}, got {mode!r}")
+    if mode == 'skip':
+        return
+    with app.app_context():
+        if mode == 'create':
+            init_schema()
+        else:
+            check_schema(app)
+
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing tables, apply pending migrations and stamp the schema version."""
+        version = init_schema(echo=click.echo)
+        click.echo(f"✓ Database schema is at version {version}")
+    
+    @app.cli.command('migrate')
+    @click.option('--to', 'target', type=int, help='Stop after this version.')
+    @click.option('--list', 'show', is_flag=True, help='List migrations and exit.')
+    @click.option('--batch-size', type=int, help='Rows per backfill batch (default 5000).')
+    @click.option('--throttle', type=float, help='Seconds to sleep between backfill batches (default 0.05).')
+    def migrate_command(target, show, batch_size, throttle):
+        """Apply pending schema migrations (online: batched backfills, concurrent indexes)."""
+        from migrations import MIGRATIONS, pending_migrations
+        if not inspect(db.engine).has_table('users'):
+            raise click.ClickException("No tables yet; run `flask --app wsgi init-db` first")
+        
+        version = stored_version()
+        if show:
+            pending = {m.version for m in pending_migrations(version)}
+            for m in MIGRATIONS:
+                click.echo(f"  {'pending' if m.version in pending else 'applied':<8} {m.version:>3}  {m.description}")
+            return
+        
+        version = run_migrations(target, batch_size, throttle, echo=click.echo)
+        click.echo(f"✓ Database schema is at version {version}")
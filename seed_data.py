@@ -0,0 +1,309 @@
+"""
+Bulk synthetic data for scale-testing the schema (indexes, pagination, dashboards).
+
+    python seed_data.py --users 1000000                    # DATABASE_URL from .env
+    python seed_data.py --users 200000 --chat-rate 0.6 --chat-turns-median 20
+    DATABASE_URL=postgresql://localhost/innerwork_scale python seed_data.py --users 2000000
+
+Generates users, enrollments, purchases, quiz progress, chat history and the
+matching user_course_summary rows. Rows are produced as a stream and written
+in batches: COPY on PostgreSQL, DB-API executemany everywhere else, never ORM
+session.add loops, so memory stays flat and a million users takes minutes.
+
+Every run appends: user ids continue after the current maximum and emails are
+tagged with the run's seed, so runs can be stacked. Seeded users share the
+password `synthetic-password`. Refuses to run with FLASK_ENV=production.
+
+Distributions (all configurable, see --help):
+- sign-up dates uniform over the last --days days;
+- --enroll-rate of users enroll; each takes another course with probability
+  --more-courses, so most hold one or two;
+- --purchase-rate of enrollments have a completed purchase, and
+  --abandoned-rate of users leave a pending/failed checkout behind;
+- enrollment progress is skewed towards the start of a course, and
+  --completion-rate of enrollments finish with a quiz score;
+- --chat-rate of users chat; turns per chatter follow a Pareto tail with the
+  given median (a few very heavy users, like production).
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+SYNTHETIC_PASSWORD = 'synthetic-password'
+
+# Parents before children so foreign keys hold at every flush
+TABLE_ORDER = ('users', 'enrollments', 'purchases', 'progress', 'chat_history', 'user_course_summary')
+
+COLUMNS = {
+    'users': ('id', 'name', 'email', 'password_hash', 'created_at'),
+    'enrollments': ('user_id', 'module_id', 'progress', 'status', 'created_at'),
+    'purchases': ('user_id', 'module_id', 'plan_type', 'payment_status', 'stripe_payment_id', 'created_at'),
+    'progress': ('user_id', 'module_id', 'score', 'completed_date'),
+    'chat_history': ('user_id', 'message', 'response', 'timestamp'),
+    'user_course_summary': ('user_id', 'module_id', 'enrolled', 'purchased', 'progress', 'status',
+                            'quiz_score', 'quiz_completed_at', 'enrolled_at', 'updated_at'),
+}
+
+FIRST_NAMES = ('Avery', 'Jordan', 'Sam', 'Riley', 'Morgan', 'Casey', 'Jamie', 'Taylor', 'Quinn', 'Rowan',
+               'Elliott', 'Debbie', 'Alex', 'Drew', 'Harper', 'Kai', 'Noor', 'Priya', 'Mateo', 'Yuki')
+LAST_NAMES = ('Lee', 'Garcia', 'Nguyen', 'Smith', 'Okafor', 'Kowalski', 'Haddad', 'Silva', 'Brown', 'Kim')
+
+MESSAGE_PARTS = (
+    "I've been feeling overwhelmed at work lately.",
+    "How do I set a boundary with my mother without feeling guilty?",
+    "The breathing exercise from lesson two helped a little.",
+    "I keep apologizing for things that aren't my fault.",
+    "Can you explain the difference between grief and depression?",
+    "I had a hard night and couldn't sleep.",
+    "What does it mean to separate identity from experience?",
+    "My partner and I argued again about the same thing.",
+    "I want to get better at noticing my emotions.",
+    "Today was actually a good day.",
+)
+RESPONSE_PARTS = (
+    "That sounds really heavy, and it makes sense you'd feel that way.",
+    "Let's slow down for a moment and take one deep breath together.",
+    "What do you notice in your body when that happens?",
+    "Setting a boundary is an act of care, for you and for the relationship.",
+    "Grief doesn't follow a schedule; there's no right way to move through it.",
+    "You might try the journaling prompt from this module tonight.",
+    "It's okay to notice the feeling without needing to fix it right away.",
+    "If you ever feel unsafe, please reach out to a crisis line or a professional right away.",
+    "What would you say to a friend in the same situation?",
+    "I'm glad today felt lighter. What helped?",
+)
+
+
+class BulkWriter:
+    """Buffer rows per table and write them in batches with COPY or executemany."""
+
+    def __init__(self, engine, batch_size):
+        self.dialect = engine.dialect.name
+        self.paramstyle = engine.dialect.paramstyle
+        self.connection = engine.raw_connection()
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in TABLE_ORDER}
+        self.counts = Counter()
+
+    def add(self, table, row):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every buffer (in TABLE_ORDER) and commit."""
+        cursor = self.connection.cursor()
+        for table in TABLE_ORDER:
+            rows = self.buffers[table]
+            if not rows:
+                continue
+            if self.dialect == 'postgresql':
+                self._copy(cursor, table, rows)
+            else:
+                self._executemany(cursor, table, rows)
+            self.counts[table] += len(rows)
+            self.buffers[table] = []
+        self.connection.commit()
+        cursor.close()
+
+    def _copy(self, cursor, table, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN", buffer)
+
+    def _executemany(self, cursor, table, rows):
+        columns = COLUMNS[table]
+        placeholder = '?' if self.paramstyle == 'qmark' else '%s'
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+        cursor.executemany(sql, [tuple(_db_value(value) for value in row) for row in rows])
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+def _timestamp(value):
+    # SQLAlchemy's own SQLite DateTime format, also accepted by PostgreSQL
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _db_value(value):
+    if isinstance(value, datetime):
+        return _timestamp(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return _timestamp(value)
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return str(value)
+
+
+def pareto_count(rng, median, alpha, maximum):
+    """Integer draw from a Pareto tail with the given median, clamped to [1, maximum]."""
+    # Pareto(alpha) with scale 1 has median 2 ** (1 / alpha)
+    value = median * rng.paretovariate(alpha) / 2 ** (1 / alpha)
+    return max(1, min(maximum, int(value)))
+
+
+def random_between(rng, start, end):
+    return start + timedelta(seconds=rng.random() * max((end - start).total_seconds(), 0))
+
+
+def generate(writer, args, course_ids, first_id, password_hash):
+    """Stream every synthetic row into the writer."""
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    window_start = now - timedelta(days=args.days)
+    # A pool of texts keeps generation cheap while sizes stay realistic
+    messages = [' '.join(rng.sample(MESSAGE_PARTS, rng.randint(1, 3))) for _ in range(500)]
+    responses = [' '.join(rng.sample(RESPONSE_PARTS, rng.randint(2, 4))) for _ in range(500)]
+
+    for user_id in range(first_id, first_id + args.users):
+        signed_up = random_between(rng, window_start, now)
+        writer.add('users', (
+            user_id,
+            f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            f'synthetic-{args.seed}-{user_id}@example.test',
+            password_hash,
+            signed_up,
+        ))
+
+        courses = []
+        if rng.random() < args.enroll_rate:
+            courses.append(rng.choice(course_ids))
+            while len(courses) < len(course_ids) and rng.random() < args.more_courses:
+                courses.append(rng.choice([c for c in course_ids if c not in courses]))
+
+        for course_id in courses:
+            enrolled_at = random_between(rng, signed_up, now)
+            completed = rng.random() < args.completion_rate
+            # Most learners stall early in a course
+            progress = 100 if completed else int(100 * rng.random() ** 2)
+            status = 'complete' if completed else 'in_progress'
+            writer.add('enrollments', (user_id, course_id, progress, status, enrolled_at))
+
+            purchased = rng.random() < args.purchase_rate
+            if purchased:
+                writer.add('purchases', (user_id, course_id, 'one-time', 'completed',
+                                         f'synthetic_{user_id}_{course_id}', enrolled_at))
+
+            score = quiz_at = None
+            if completed:
+                score = rng.choice((50, 75, 100, 100))
+                quiz_at = random_between(rng, enrolled_at, now)
+                writer.add('progress', (user_id, course_id, score, quiz_at))
+
+            writer.add('user_course_summary', (user_id, course_id, True, purchased, progress, status,
+                                               score, quiz_at, enrolled_at, now))
+
+        if rng.random() < args.abandoned_rate:
+            course_id = rng.choice(course_ids)
+            if course_id not in courses:
+                writer.add('purchases', (user_id, course_id, 'one-time', rng.choice(('pending', 'failed')),
+                                         None, random_between(rng, signed_up, now)))
+
+        if rng.random() < args.chat_rate:
+            turns = pareto_count(rng, args.chat_turns_median, args.chat_tail, args.chat_turns_max)
+            times = sorted(random_between(rng, signed_up, now) for _ in range(turns))
+            for sent_at in times:
+                writer.add('chat_history', (user_id, rng.choice(messages), rng.choice(responses), sent_at))
+
+        if args.progress_every and (user_id - first_id + 1) % args.progress_every == 0:
+            print(f"  {user_id - first_id + 1:,} users...", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-generate synthetic users, enrollments and chat history.')
+    parser.add_argument('--users', type=int, default=100000, help='Users to create (default: 100000)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed; also tags the generated emails')
+    parser.add_argument('--days', type=int, default=730, help='Sign-ups spread over this many days')
+    parser.add_argument('--enroll-rate', type=float, default=0.7, help='Share of users with an enrollment')
+    parser.add_argument('--more-courses', type=float, default=0.35,
+                        help='Chance an enrolled user takes one more course (repeats)')
+    parser.add_argument('--purchase-rate', type=float, default=0.85,
+                        help='Share of enrollments with a completed purchase')
+    parser.add_argument('--abandoned-rate', type=float, default=0.05,
+                        help='Share of users with a pending/failed checkout')
+    parser.add_argument('--completion-rate', type=float, default=0.3,
+                        help='Share of enrollments completed with a quiz score')
+    parser.add_argument('--chat-rate', type=float, default=0.4, help='Share of users who use the chatbot')
+    parser.add_argument('--chat-turns-median', type=float, default=8, help='Median chat turns per chatting user')
+    parser.add_argument('--chat-tail', type=float, default=1.3, help='Pareto alpha; lower = heavier tail')
+    parser.add_argument('--chat-turns-max', type=int, default=5000, help='Cap on chat turns per user')
+    parser.add_argument('--batch', type=int, default=20000, help='Rows buffered per table before writing')
+    parser.add_argument('--progress-every', type=int, default=100000, help='Print progress every N users (0: off)')
+    args = parser.parse_args()
+
+    if os.getenv('FLASK_ENV') == 'production':
+        sys.exit("✗ Refusing to generate synthetic data with FLASK_ENV=production")
+
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from models import db, Module, User, CHAT_FTS_DDL, CHAT_FTS_TABLE
+    from routes.courses import courses_data
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        Module.sync_catalog(courses_data)
+        db.session.commit()
+
+        first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+        engine = db.engine
+        print(f"Generating {args.users:,} users on {engine.dialect.name} (ids from {first_id:,})...")
+
+        started = time.perf_counter()
+        writer = BulkWriter(engine, args.batch)
+        if engine.dialect.name == 'sqlite':
+            # Durability doesn't matter for throwaway data; this is most of SQLite's insert cost
+            writer.connection.cursor().execute('PRAGMA synchronous = OFF')
+        fts = engine.dialect.name == 'sqlite' and db.inspect(engine).has_table(CHAT_FTS_TABLE)
+        if fts:
+            # One FTS rebuild at the end is several times faster than the per-row trigger
+            writer.connection.cursor().execute('DROP TRIGGER IF EXISTS chat_history_fts_insert')
+        try:
+            generate(writer, args, [course['id'] for course in courses_data], first_id,
+                     generate_password_hash(SYNTHETIC_PASSWORD))
+        finally:
+            writer.close()
+            if fts:
+                with engine.begin() as connection:
+                    for statement in CHAT_FTS_DDL:
+                        connection.exec_driver_sql(statement)
+                    connection.exec_driver_sql(f"INSERT INTO {CHAT_FTS_TABLE}({CHAT_FTS_TABLE}) VALUES ('rebuild')")
+        elapsed = time.perf_counter() - started
+
+        with engine.begin() as connection:
+            if engine.dialect.name == 'postgresql':
+                connection.execute(db.text(
+                    "SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT MAX(id) FROM users))"))
+            # Fresh planner statistics, or the first EXPLAINs describe an empty table
+            connection.execute(db.text('ANALYZE'))
+
+    total = sum(writer.counts.values())
+    print()
+    for table in TABLE_ORDER:
+        print(f"  ✓ {table:<22} {writer.counts[table]:>12,}")
+    print(f"\n✅ {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)" if elapsed else "\n✅ Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Server-side sessions in a local SQLite file, for development and single-box
+installs without REDIS_URL (Flask-Session's filesystem mode writes one file
+per session and never removes abandoned ones).
+
+    sessions(id TEXT PRIMARY KEY, data BLOB, expiry REAL)  -- WITHOUT ROWID, WAL
+
+- Every session expires PERMANENT_SESSION_LIFETIME (SESSION_LIFETIME_DAYS)
+  after its last write; expired rows are never returned, even before GC.
+- GC deletes expired rows in small batches on roughly one request in
+  SESSION_CLEANUP_N_REQUESTS. With that set to 0, run `flask session_cleanup`
+  from cron instead.
+- A request that didn't modify its session writes nothing. To keep active
+  sessions alive, an unmodified session is rewritten (new expiry, fresh
+  cookie) only once its stored expiry is more than TOUCH_INTERVAL old.
+  So a session lives between lifetime - TOUCH_INTERVAL and lifetime after
+  its last request.
+
+Data is serialized with Flask-Session's own msgpack serializer. One
+connection per thread is used, and gunicorn workers drop the one inherited
+from the master after fork (see app.reset_after_fork).
+"""
+import os
+import sqlite3
+import threading
+import time
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+
+TOUCH_INTERVAL = 3600
+GC_BATCH = 1000
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL, expiry REAL NOT NULL) "
+    "WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_sessions_expiry ON sessions (expiry)",
+)
+
+
+class SQLiteSession(ServerSideSession):
+    # Expiry of the stored copy, None for a session that isn't stored yet
+    stored_expiry = None
+
+
+class SQLiteSessionInterface(ServerSideSessionInterface):
+    """Flask-Session interface backed by one SQLite file."""
+
+    session_class = SQLiteSession
+    # Not a TTL store: the base class wires up cleanup_n_requests / session_cleanup
+    ttl = False
+
+    def __init__(self, app, path, key_prefix='session:', use_signer=False, permanent=True,
+                 sid_length=32, serialization_format='msgpack', cleanup_n_requests=None):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode = WAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+        finally:
+            conn.close()
+        super().__init__(app, key_prefix, use_signer, permanent, sid_length, serialization_format,
+                         cleanup_n_requests)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                               check_same_thread=False)
+        # WAL makes fsync on checkpoint enough; losing the last sessions on power loss is fine
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = self._local.connection = self._connect()
+        return conn
+
+    def reset(self):
+        """Forget connections inherited across fork (each worker opens its own)."""
+        self._local = threading.local()
+
+    # -- Flask-Session hooks --------------------------------------------------
+
+    def open_session(self, app, request):
+        self._local.loaded_expiry = None
+        session = super().open_session(app, request)
+        session.stored_expiry = self._local.loaded_expiry
+        return session
+
+    def should_set_storage(self, app, session):
+        if session.modified:
+            return True
+        if not app.config['SESSION_REFRESH_EACH_REQUEST'] or session.stored_expiry is None:
+            return False
+        # Unmodified: only rewrite once the stored expiry is TOUCH_INTERVAL stale
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        return session.stored_expiry < time.time() + lifetime - TOUCH_INTERVAL
+
+    def _retrieve_session_data(self, store_id):
+        row = self.connection.execute(
+            'SELECT data, expiry FROM sessions WHERE id = ? AND expiry > ?', (store_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        self._local.loaded_expiry = row[1]
+        return self.serializer.decode(row[0])
+
+    def _delete_session(self, store_id):
+        self.connection.execute('DELETE FROM sessions WHERE id = ?', (store_id,))
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        expiry = time.time() + session_lifetime.total_seconds()
+        self.connection.execute(
+            'INSERT INTO sessions (id, data, expiry) VALUES (?, ?, ?) '
+            'ON CONFLICT (id) DO UPDATE SET data = excluded.data, expiry = excluded.expiry',
+            (store_id, self.serializer.encode(session), expiry)
+        )
+        session.stored_expiry = expiry
+
+    def _delete_expired_sessions(self):
+        """Delete expired sessions, GC_BATCH rows per statement so writers never wait long."""
+        deleted, now = 0, time.time()
+        while True:
+            count = self.connection.execute(
+                'DELETE FROM sessions WHERE id IN (SELECT id FROM sessions WHERE expiry <= ? LIMIT ?)',
+                (now, GC_BATCH)
+            ).rowcount
+            deleted += count
+            if count < GC_BATCH:
+                return deleted
+
+
+def init_sessions(app):
+    """Install the session interface: SQLiteSessionInterface for SESSION_TYPE 'sqlite', else Flask-Session's."""
+    if app.config.get('SESSION_TYPE') != 'sqlite':
+        from flask_session import Session
+        Session(app)
+        return
+
+    path = app.config['SESSION_SQLITE_PATH']
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    app.session_interface = SQLiteSessionInterface(
+        app, path,
+        key_prefix=app.config.get('SESSION_KEY_PREFIX', 'session:'),
+        use_signer=app.config.get('SESSION_USE_SIGNER', False),
+        permanent=app.config.get('SESSION_PERMANENT', True),
+        cleanup_n_requests=app.config.get('SESSION_CLEANUP_N_REQUESTS')
+    )
@@ -0,0 +1,40 @@
+// Personalized course state for cached course pages
+//
+// Course pages are rendered once and served from the page cache, so they
+// never contain per-user enrollment state. This script fetches the small
+// /courses/access fragment and shows the "purchased" or "not-purchased"
+// variant of each [data-course-actions] block.
+
+(function() {
+    const script = document.currentScript;
+    const accessUrl = script && script.dataset.accessUrl;
+
+    document.addEventListener('DOMContentLoaded', async function() {
+        const blocks = document.querySelectorAll('[data-course-actions]');
+        if (!accessUrl || blocks.length === 0) {
+            return;
+        }
+
+        try {
+            const response = await fetch(accessUrl, { credentials: 'same-origin' });
+            if (!response.ok) {
+                return;
+            }
+            const data = await response.json();
+            const purchased = new Set(data.purchased_ids || []);
+
+            blocks.forEach((block) => {
+                const isPurchased = purchased.has(Number(block.dataset.courseActions));
+                block.querySelectorAll('[data-when="purchased"]').forEach((el) => {
+                    el.classList.toggle('d-none', !isPurchased);
+                });
+                block.querySelectorAll('[data-when="not-purchased"]').forEach((el) => {
+                    el.classList.toggle('d-none', isPurchased);
+                });
+            });
+        } catch (error) {
+            // Leave the default (not purchased) state; purchase_module guards against duplicates
+            console.error('Could not load course access:', error);
+        }
+    });
+})();
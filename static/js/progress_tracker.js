@@ -0,0 +1,102 @@
+// Debounced lesson progress tracking for InnerWork
+//
+// Collects progress events in memory and sends them to the batch endpoint
+// in one request, instead of POSTing every scroll tick individually.
+// The server coalesces events per module (max wins), so we only need to
+// keep the highest percent seen for each module between flushes.
+
+class ProgressTracker {
+    constructor(endpoint, options = {}) {
+        this.endpoint = endpoint;
+        this.debounceMs = options.debounceMs || 2000;
+        this.maxWaitMs = options.maxWaitMs || 10000;
+        this.pending = {};
+        this.timer = null;
+        this.firstQueuedAt = null;
+
+        // Flush whatever is left when the page is hidden or closed
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') {
+                this.flush(true);
+            }
+        });
+        window.addEventListener('pagehide', () => this.flush(true));
+    }
+
+    // Queue a progress event; only the highest percent per module is kept
+    track(moduleId, percent) {
+        percent = Math.max(0, Math.min(100, Math.round(percent)));
+        if (this.pending[moduleId] !== undefined && this.pending[moduleId] >= percent) {
+            return;
+        }
+        this.pending[moduleId] = percent;
+
+        const now = Date.now();
+        if (this.firstQueuedAt === null) {
+            this.firstQueuedAt = now;
+        }
+
+        clearTimeout(this.timer);
+        // Don't let a continuous stream of events postpone the write forever
+        const wait = Math.min(this.debounceMs, Math.max(0, this.firstQueuedAt + this.maxWaitMs - now));
+        this.timer = setTimeout(() => this.flush(), wait);
+    }
+
+    // Send all pending events in a single request
+    flush(useBeacon = false) {
+        clearTimeout(this.timer);
+        this.timer = null;
+        this.firstQueuedAt = null;
+
+        const events = Object.entries(this.pending).map(([moduleId, percent]) => ({
+            module_id: Number(moduleId),
+            percent: percent
+        }));
+        if (events.length === 0) {
+            return;
+        }
+        this.pending = {};
+
+        const body = JSON.stringify({ events: events });
+
+        if (useBeacon && navigator.sendBeacon) {
+            navigator.sendBeacon(this.endpoint, new Blob([body], { type: 'application/json' }));
+            return;
+        }
+
+        fetch(this.endpoint, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: body,
+            keepalive: true
+        }).catch((error) => {
+            // Re-queue on network failure so the next flush retries
+            console.error('Progress sync failed:', error);
+            events.forEach((event) => this.track(event.module_id, event.percent));
+        });
+    }
+}
+
+// Auto-wire lesson pages: <div data-progress-tracker data-endpoint="..." data-module-id="..."
+//                                 data-lesson-num="..." data-total-lessons="...">
+document.addEventListener('DOMContentLoaded', function() {
+    const el = document.querySelector('[data-progress-tracker]');
+    if (!el) {
+        return;
+    }
+
+    const tracker = new ProgressTracker(el.dataset.endpoint);
+    const moduleId = Number(el.dataset.moduleId);
+    const lessonNum = Number(el.dataset.lessonNum);
+    const totalLessons = Number(el.dataset.totalLessons);
+
+    // Course percent = completed lessons + fraction of the current lesson scrolled
+    function reportScroll() {
+        const scrollable = document.documentElement.scrollHeight - window.innerHeight;
+        const fraction = scrollable > 0 ? Math.min(1, window.scrollY / scrollable) : 1;
+        tracker.track(moduleId, ((lessonNum - 1 + fraction) / totalLessons) * 100);
+    }
+
+    window.addEventListener('scroll', reportScroll, { passive: true });
+    reportScroll();
+});
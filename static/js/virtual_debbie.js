@@ -13,19 +13,19 @@ document.addEventListener("DOMContentLoaded", function() {
   const lines = [
     { 
       text: "Welcome back — it's good to see you again.", 
-      audio: "/static/media/debbie_line1.wav" 
+      audio: "/media/debbie_line1.wav" 
     },
     { 
       text: "Remember: healing takes patience and gentleness.", 
-      audio: "/static/media/debbie_line2.wav" 
+      audio: "/media/debbie_line2.wav" 
     },
     { 
       text: "Let's take a moment to breathe before we continue.", 
-      audio: "/static/media/debbie_line3.wav" 
+      audio: "/media/debbie_line3.wav" 
     },
     { 
       text: "You're doing wonderful work today.", 
-      audio: "/static/media/debbie_line4.wav" 
+      audio: "/media/debbie_line4.wav" 
     }
   ];
 
@@ -12,15 +12,15 @@ document.addEventListener("DOMContentLoaded", function() {
   const lines = [
     { 
       text: "Welcome back. Take a deep breath in—and out.", 
-      audio: "/static/media/Greeting1.mp3" 
+      audio: "/media/Greeting1.mp3" 
     },
     { 
       text: "Let's focus on one gentle step forward today.", 
-      audio: "/static/media/Greeting2.mp3" 
+      audio: "/media/Greeting2.mp3" 
     },
     { 
       text: "Relax your shoulders. You're doing great.", 
-      audio: "/static/media/Micropractice.mp3" 
+      audio: "/media/Micropractice.mp3" 
     }
   ];
 
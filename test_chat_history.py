@@ -0,0 +1,81 @@
+"""
+/chatbot/history paging across hot and archived turns, and /chatbot/search (run with pytest).
+"""
+from datetime import datetime, timedelta
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'chat.db'}")
+    monkeypatch.setenv('SESSION_SQLITE_PATH', str(tmp_path / 'sessions.db'))
+    monkeypatch.setenv('SCHEMA_CHECK', 'create')
+    monkeypatch.setenv('REDIS_URL', '')
+    monkeypatch.setenv('DATABASE_REPLICA_URL', '')
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield app
+
+
+def test_history_pages_keep_turns_that_share_a_timestamp(app):
+    from models import db, User, ChatHistory
+    from chat_archive import archive_user, archive_cutoff
+
+    user = User(name='Chatter', email='chatter@example.test')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.flush()
+    # Bulk-imported turns: seven share each timestamp, the old ones get archived
+    old, recent = datetime.utcnow() - timedelta(days=400), datetime.utcnow() - timedelta(days=1)
+    for timestamp in (old, recent):
+        for n in range(7):
+            db.session.add(ChatHistory(user_id=user.id, message=f'{timestamp:%Y} {n}', response='ok',
+                                       timestamp=timestamp))
+    db.session.commit()
+    archive_user(user.id, archive_cutoff(90), 'gzip')
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'chatter@example.test', 'password': 'password'})
+    seen, before = [], None
+    while True:
+        page = client.get('/chatbot/history', query_string={'limit': 3, **({'before': before} if before else {})})
+        data = page.get_json()
+        seen = [turn['message'] for turn in data['history']] + seen
+        before = data['next_before']
+        if not before:
+            break
+
+    assert len(seen) == 14 and len(set(seen)) == 14
+    assert sum(turn['archived'] for turn in client.get('/chatbot/history').get_json()['history']) == 7
+
+
+def test_search_only_matches_the_users_own_turns(app):
+    from models import db, User, ChatHistory
+
+    users = []
+    for email in ('chatter@example.test', 'other@example.test'):
+        user = User(name='Chatter', email=email)
+        user.set_password('password')
+        db.session.add(user)
+        users.append(user)
+    db.session.flush()
+    me, other = users
+    db.session.add_all([
+        ChatHistory(user_id=me.id, message='How do I set boundaries?', response='Start small.'),
+        ChatHistory(user_id=me.id, message='Another boundary talk', response='Boundaries protect you.'),
+        ChatHistory(user_id=me.id, message=f'u{other.id} is just a word here', response='ok'),
+        ChatHistory(user_id=other.id, message='Setting a boundary with my boss', response='Be clear.'),
+    ])
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'chatter@example.test', 'password': 'password'})
+    hits = client.get('/chatbot/search', query_string={'q': 'boundary'}).get_json()['results']
+    # Best match first: two hits beat one
+    assert [hit['message'] for hit in hits] == ['Another boundary talk', 'How do I set boundaries?']
+    # An owner token typed as a search term only matches message text
+    hits = client.get('/chatbot/search', query_string={'q': f'u{other.id}'}).get_json()['results']
+    assert [hit['message'] for hit in hits] == [f'u{other.id} is just a word here']
@@ -0,0 +1,125 @@
+"""
+Upgrade paths for databases created before the current schema (run with pytest).
+"""
+import pytest
+from sqlalchemy import inspect, text
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'legacy.db'}")
+    monkeypatch.setenv('SESSION_SQLITE_PATH', str(tmp_path / 'sessions.db'))
+    monkeypatch.setenv('SCHEMA_CHECK', 'skip')
+    monkeypatch.setenv('REDIS_URL', '')
+    monkeypatch.setenv('DATABASE_REPLICA_URL', '')
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield app
+
+
+def make_legacy_database(version, enrollments=False):
+    """Tables as init_schema() left them before migrations existed, stamped at version.
+
+    enrollments keeps the table that migrate_db.py used to add by hand.
+    """
+    from models import db
+    from schema import SchemaVersion
+    db.create_all()
+    with db.engine.begin() as conn:
+        # create_all() never altered existing tables, so these were missing
+        for column in ('updated_at', 'price_cents', 'duration_label'):
+            conn.execute(text(f"ALTER TABLE modules DROP COLUMN {column}"))
+        if not enrollments:
+            conn.execute(text("DROP TABLE enrollments"))
+    db.session.add(SchemaVersion(version=version))
+    db.session.commit()
+
+
+def test_database_stamped_at_version_2_gets_module_columns(app):
+    from models import db, Module
+    from schema import init_schema, stored_version, SCHEMA_VERSION
+    make_legacy_database(2)
+
+    assert init_schema(echo=lambda message: None) == SCHEMA_VERSION
+    assert stored_version() == SCHEMA_VERSION
+    columns = {c['name'] for c in inspect(db.engine).get_columns('modules')}
+    assert {'updated_at', 'price_cents', 'duration_label'} <= columns
+    assert inspect(db.engine).has_table('enrollments')
+    assert Module.query.all() == []
+
+
+def add_paying_user(email='buyer@example.test', enroll=True):
+    """A user with a completed purchase (and enrollment) of course 1 but no summary rows."""
+    from models import db, User, Purchase, Enrollment
+    user = User(name='Buyer', email=email)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(Purchase(user_id=user.id, module_id=1, plan_type='one-time', payment_status='completed'))
+    if enroll:
+        db.session.add(Enrollment(user_id=user.id, module_id=1, progress=20, status='in_progress'))
+    db.session.commit()
+    return user.id
+
+
+def login(app, email='buyer@example.test'):
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': 'password'})
+    return client
+
+
+def test_upgrade_backfills_course_summaries(app):
+    from models import UserCourseSummary
+    from schema import init_schema
+    make_legacy_database(2, enrollments=True)
+    user_id = add_paying_user()
+
+    init_schema(echo=lambda message: None)
+
+    summary = UserCourseSummary.query.filter_by(user_id=user_id, module_id=1).one()
+    assert summary.purchased and summary.enrolled and summary.progress == 20
+    client = login(app)
+    assert client.get('/lessons/1/1').status_code == 200
+
+
+def test_access_falls_back_to_purchases_before_backfill(app):
+    from models import UserCourseSummary
+    from schema import init_schema
+    init_schema(echo=lambda message: None)
+    user_id = add_paying_user(enroll=False)
+    assert UserCourseSummary.query.filter_by(user_id=user_id).count() == 0
+
+    client = login(app)
+    assert client.get('/lessons/1/1').status_code == 200
+    assert client.get('/courses/access').get_json()['purchased_ids'] == [1]
+    assert client.get('/lessons/2/1').status_code == 302
+
+
+def test_chat_search_index_gains_owner_column(app):
+    from models import db, User, ChatHistory, CHAT_FTS_DROP, CHAT_FTS_TABLE
+    from schema import init_schema, SchemaVersion
+    from chat_search import search_turns
+    init_schema(echo=lambda message: None)
+    with db.engine.begin() as conn:
+        # The FTS5 table as migration 7 first built it: no owner column
+        for statement in CHAT_FTS_DROP:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql(f"CREATE VIRTUAL TABLE {CHAT_FTS_TABLE} USING fts5(message, response, "
+                             "content='chat_history', content_rowid='id', tokenize='porter unicode61')")
+    SchemaVersion.query.one().version = 8
+    user = User(name='Chatter', email='chatter@example.test')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.flush()
+    user_id = user.id
+    db.session.add(ChatHistory(user_id=user_id, message='Setting boundaries', response='ok'))
+    db.session.commit()
+
+    init_schema(echo=lambda message: None)
+
+    turns, _ = search_turns(user_id, 'boundary')
+    assert [turn['message'] for turn in turns] == ['Setting boundaries']
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(f"INSERT INTO {CHAT_FTS_TABLE}({CHAT_FTS_TABLE}) VALUES ('integrity-check')")
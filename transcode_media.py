@@ -0,0 +1,229 @@
+"""
+Offline transcoding for the Virtual Debbie / Elliott avatar media.
+
+    python transcode_media.py [--force] [--jobs N]
+
+Reads static/media and writes lighter variants to static/media/encoded/:
+
+- WAV voice lines -> Opus (Ogg) and MP3, mono
+- GIF and MP4 avatars -> looping WebM (VP9) and MP4 (H.264) with no audio track
+- GIF avatars -> animated WebP, the <img> fallback for browsers without video
+
+Avatars are encoded at 1x and 2x their display size (AVATAR_DISPLAY_WIDTH),
+never upscaled past the source. Variants that come out no smaller than the
+original are dropped.
+
+Everything is recorded in static/media/encoded/manifest.json, keyed by the
+original filename, with sources ordered lightest first per pixel density.
+media.media_variants() reads it so the avatar templates list the smallest
+format first and the browser takes the first one it can play; .wav requests
+to /media are answered with the encoded audio. Inputs whose content hash
+hasn't changed are skipped, so build.sh can run this on every deploy
+(before assets.py, which then fingerprints the variants).
+
+Audio and video need ffmpeg on PATH. Without it only the WebP fallbacks are
+written and the pages keep using the originals.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MEDIA_DIR = os.path.join(BASE_DIR, 'static', 'media')
+ENCODED_DIR = os.path.join(MEDIA_DIR, 'encoded')
+MANIFEST_PATH = os.path.join(ENCODED_DIR, 'manifest.json')
+
+# Both widgets show the avatar at 220x220 CSS pixels
+AVATAR_DISPLAY_WIDTH = 220
+DENSITIES = (1, 2)
+
+# (suffix, mimetype, ffmpeg output options)
+AUDIO_FORMATS = (
+    ('.opus', 'audio/ogg; codecs=opus', ['-c:a', 'libopus', '-b:a', '32k', '-ac', '1']),
+    ('.mp3', 'audio/mpeg', ['-c:a', 'libmp3lame', '-q:a', '6', '-ac', '1']),
+)
+VIDEO_FORMATS = (
+    ('.webm', 'video/webm', ['-c:v', 'libvpx-vp9', '-crf', '40', '-b:v', '0', '-row-mt', '1']),
+    ('.mp4', 'video/mp4', ['-c:v', 'libx264', '-crf', '28', '-preset', 'slow',
+                           '-pix_fmt', 'yuv420p', '-movflags', '+faststart']),
+)
+WEBP_QUALITY = 70
+
+
+def _digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _ffmpeg(*args):
+    subprocess.run(['ffmpeg', '-y', '-nostdin', '-loglevel', 'error', *args], check=True)
+
+
+def _source_width(path):
+    if path.lower().endswith('.gif'):
+        from PIL import Image
+        with Image.open(path) as im:
+            return im.width
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width', '-of', 'csv=p=0', path],
+        check=True, capture_output=True, text=True)
+    return int(result.stdout.strip())
+
+
+def _target_widths(source_width):
+    """Display widths for each density, capped at the source width (deduplicated)."""
+    widths = {}
+    for density in DENSITIES:
+        width = min(AVATAR_DISPLAY_WIDTH * density, source_width)
+        # ffmpeg's yuv420p needs even dimensions
+        width -= width % 2
+        widths.setdefault(width, density)
+    return [(width, density) for width, density in widths.items()]
+
+
+def _encode_audio(source, output, options):
+    _ffmpeg('-i', source, '-vn', *options, output)
+
+
+def _encode_video(source, output, width, options):
+    _ffmpeg('-i', source, '-an', '-vf', f'scale={width}:-2:flags=lanczos', *options, output)
+
+
+def _encode_webp(source, output, width):
+    from PIL import Image, ImageSequence
+    with Image.open(source) as im:
+        height = round(im.height * width / im.width)
+        frames, durations = [], []
+        for frame in ImageSequence.Iterator(im):
+            frames.append(frame.convert('RGBA').resize((width, height), Image.LANCZOS))
+            durations.append(frame.info.get('duration', im.info.get('duration', 100)))
+        frames[0].save(output, format='WEBP', save_all=True, append_images=frames[1:],
+                       duration=durations, loop=0, quality=WEBP_QUALITY, method=6)
+
+
+def plan(filename, have_ffmpeg):
+    """List of (output name, mimetype, width, density, encode callable) for one original."""
+    source = os.path.join(MEDIA_DIR, filename)
+    root, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    jobs = []
+
+    if ext == '.wav' and have_ffmpeg:
+        for suffix, mimetype, options in AUDIO_FORMATS:
+            output = root + suffix
+            jobs.append((output, mimetype, None, None,
+                         lambda out, options=options: _encode_audio(source, out, options)))
+
+    elif ext in ('.gif', '.mp4'):
+        if ext == '.mp4' and not have_ffmpeg:
+            return jobs
+        for width, density in _target_widths(_source_width(source)):
+            if have_ffmpeg:
+                for suffix, mimetype, options in VIDEO_FORMATS:
+                    output = f'{root}-{width}{suffix}'
+                    jobs.append((output, mimetype, width, density,
+                                 lambda out, width=width, options=options: _encode_video(source, out, width, options)))
+            if ext == '.gif':
+                jobs.append((f'{root}-{width}.webp', 'image/webp', width, density,
+                             lambda out, width=width: _encode_webp(source, out, width)))
+    return jobs
+
+
+def _run_job(filename, job):
+    output, mimetype, width, density, encode = job
+    path = os.path.join(ENCODED_DIR, output)
+    try:
+        encode(path)
+    except Exception as e:
+        print(f"✗ {filename} -> {output}: {e}")
+        return None
+
+    size = os.path.getsize(path)
+    if size >= os.path.getsize(os.path.join(MEDIA_DIR, filename)):
+        os.remove(path)
+        print(f"  {filename} -> {output}: not smaller than the original, dropped")
+        return None
+
+    print(f"✓ {filename} -> {output} ({size // 1024} KB)")
+    source = {'file': output, 'type': mimetype, 'bytes': size}
+    if width is not None:
+        source.update(width=width, density=density)
+    return source
+
+
+def _load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _is_current(entry, digest):
+    return (entry and entry.get('digest') == digest
+            and all(os.path.isfile(os.path.join(ENCODED_DIR, s['file'])) for s in entry['sources']))
+
+
+def transcode(force=False, jobs=None):
+    have_ffmpeg = shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+    if not have_ffmpeg:
+        print("  Note: ffmpeg not found, writing WebP fallbacks only. Install ffmpeg for audio/video.")
+
+    os.makedirs(ENCODED_DIR, exist_ok=True)
+    previous = _load_manifest()
+    manifest = {}
+    pending = {}
+
+    for filename in sorted(os.listdir(MEDIA_DIR)):
+        if not os.path.isfile(os.path.join(MEDIA_DIR, filename)):
+            continue
+        work = plan(filename, have_ffmpeg)
+        if not work:
+            continue
+        digest = _digest(os.path.join(MEDIA_DIR, filename))
+        if not force and _is_current(previous.get(filename), digest):
+            manifest[filename] = previous[filename]
+            print(f"  {filename}: unchanged")
+            continue
+        pending[filename] = (digest, work)
+
+    # ffmpeg does the heavy lifting in subprocesses, so threads are enough to keep every core busy
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        futures = {
+            filename: [pool.submit(_run_job, filename, job) for job in work]
+            for filename, (digest, work) in pending.items()
+        }
+        for filename, results in futures.items():
+            sources = [future.result() for future in results]
+            sources = [s for s in sources if s is not None]
+            if sources:
+                # Highest density first (it carries a media query), lightest first within each
+                sources.sort(key=lambda s: (-s.get('density', 1), s['bytes']))
+                manifest[filename] = {'digest': pending[filename][0], 'sources': sources}
+
+    # Remove encodes no longer referenced (renamed or deleted originals, stale widths)
+    keep = {s['file'] for entry in manifest.values() for s in entry['sources']} | {'manifest.json'}
+    for name in os.listdir(ENCODED_DIR):
+        if name not in keep:
+            os.remove(os.path.join(ENCODED_DIR, name))
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"\n✅ {len(manifest)} media file(s) have encoded variants in {ENCODED_DIR}")
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Transcode avatar media into lighter formats.')
+    parser.add_argument('--force', action='store_true', help='re-encode even if the original is unchanged')
+    parser.add_argument('--jobs', type=int, default=None, help='parallel encodes (default: CPU count)')
+    args = parser.parse_args()
+    transcode(force=args.force, jobs=args.jobs)
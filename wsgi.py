@@ -0,0 +1,12 @@
+"""
+WSGI entry point with a module-level app.
+
+gunicorn (Render, Procfile) and the Vercel handler import `app` from here, so
+the app is built exactly once per process - or once in the gunicorn master
+when preload_app is enabled (see gunicorn.conf.py).
+
+    gunicorn wsgi:app
+"""
+from app import create_app
+
+app = create_app()